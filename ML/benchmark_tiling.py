@@ -0,0 +1,110 @@
+# benchmark_tiling.py
+"""
+Compare single-pass and tiled inference on a recorded hall video.
+
+Reports per-frame latency (mean / p50 / p95) for both modes, the number of
+people and phones found per frame, and how many single-pass people the
+tiled mode also finds. Without ground-truth labels the people/phones per
+frame act as the recall proxy: tiling should find more distant students
+at the cost of latency.
+
+    python benchmark_tiling.py --video test_videos/Turning_Back.mp4 --grid 3x2
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from phone_tracker import detect_phones
+from tiling import make_tiles, tiled_pose, tiled_phones, same_person
+
+
+def single_pass_pose(model, frame):
+    people = []
+    for result in model(frame, verbose=False):
+        if result.keypoints:
+            people.extend(result.keypoints.xy.cpu().numpy())
+    return people
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - start) * 1000
+
+
+def summarize(name, latencies, people, phones):
+    lat = np.array(latencies)
+    print(f"{name:<12} mean {lat.mean():7.1f} ms | p50 {np.percentile(lat, 50):7.1f} ms | "
+          f"p95 {np.percentile(lat, 95):7.1f} ms | people/frame {np.mean(people):5.2f} | "
+          f"phones/frame {np.mean(phones):5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--pose-model", default="yolov8n-pose.pt")
+    parser.add_argument("--mobile-model", default="yolo11n.pt")
+    parser.add_argument("--grid", default="2x2", help="tile grid as COLSxROWS")
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--frames", type=int, default=300, help="max frames to process")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    pose_model = YOLO(args.pose_model)
+    mobile_model = YOLO(args.mobile_model)
+    quiet_mobile = lambda source, **kw: mobile_model(source, verbose=False, **kw)
+    quiet_pose = lambda source, **kw: pose_model(source, verbose=False, **kw)
+    grid = tuple(int(v) for v in args.grid.split("x"))
+    tiles = make_tiles((args.height, args.width), grid, args.overlap)
+
+    stats = {"single": ([], [], []), "tiled": ([], [], [])}
+    matched = single_total = 0
+
+    cap = cv2.VideoCapture(args.video)
+    frame_count = 0
+    while cap.isOpened() and frame_count < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, (args.width, args.height))
+        if frame_count == 0:
+            # Warm both paths up so model initialisation doesn't skew the numbers
+            single_pass_pose(pose_model, frame)
+            tiled_pose(quiet_pose, frame, tiles)
+
+        single_people, t_pose = timed(single_pass_pose, pose_model, frame)
+        single_phones, t_phone = timed(detect_phones, quiet_mobile, frame)
+        stats["single"][0].append(t_pose + t_phone)
+        stats["single"][1].append(len(single_people))
+        stats["single"][2].append(len(single_phones))
+
+        tiled_people, t_pose = timed(tiled_pose, quiet_pose, frame, tiles)
+        tiled_phone_boxes, t_phone = timed(tiled_phones, quiet_mobile, frame, tiles)
+        stats["tiled"][0].append(t_pose + t_phone)
+        stats["tiled"][1].append(len(tiled_people))
+        stats["tiled"][2].append(len(tiled_phone_boxes))
+
+        single_total += len(single_people)
+        matched += sum(any(same_person(p, q, 15) for q in tiled_people) for p in single_people)
+        frame_count += 1
+    cap.release()
+
+    if frame_count == 0:
+        print("No frames read from", args.video)
+        return
+
+    print(f"\n{frame_count} frames at {args.width}x{args.height}, tile grid {grid[0]}x{grid[1]} "
+          f"({len(tiles)} tiles, overlap {args.overlap})\n")
+    summarize("single-pass", *stats["single"])
+    summarize("tiled", *stats["tiled"])
+    if single_total:
+        print(f"\nTiled mode re-finds {100 * matched / single_total:.1f}% of single-pass people "
+              f"and adds {np.mean(stats['tiled'][1]) - np.mean(stats['single'][1]):+.2f} people/frame.")
+
+
+if __name__ == "__main__":
+    main()
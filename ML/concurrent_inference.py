@@ -0,0 +1,73 @@
+# concurrent_inference.py
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+
+def split_threads(total=None, pose_share=0.5):
+    """
+    Partition the intra-op thread budget between the pose and phone models.
+    `total` defaults to torch's current thread count, which already honours
+    OMP_NUM_THREADS when a supervisor has set it for this worker.
+    """
+    total = total or torch.get_num_threads()
+    pose_threads = max(1, int(round(total * pose_share)))
+    mobile_threads = max(1, total - pose_threads)
+    return pose_threads, mobile_threads
+
+
+class ModelRunner:
+    """
+    A single dedicated worker thread for one model. The thread sets its own
+    intra-op thread count on start-up; with the OpenMP build of PyTorch the
+    count is per calling thread, so the two models run side by side without
+    oversubscribing the cores. PyTorch releases the GIL during inference,
+    so work submitted here overlaps with the main thread.
+    """
+
+    def __init__(self, name, num_threads):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name,
+                                           initializer=torch.set_num_threads,
+                                           initargs=(num_threads,))
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class LatencyStats:
+    """
+    Rolling per-frame latency. Every `report_every` frames prints a single
+    `[STATS]` line with throughput and latency percentiles, which is easy to
+    grep in logs and to parse by whatever is supervising the worker.
+    """
+
+    def __init__(self, report_every=100, window=300):
+        self.report_every = report_every
+        self.latencies = deque(maxlen=window)
+        self.stamps = deque(maxlen=window)
+        self.frames = 0
+
+    def add(self, frame_start):
+        now = time.perf_counter()
+        self.latencies.append((now - frame_start) * 1000)
+        self.stamps.append(now)
+        self.frames += 1
+        if self.frames % self.report_every == 0:
+            self.report()
+
+    def fps(self):
+        if len(self.stamps) < 2:
+            return 0.0
+        return (len(self.stamps) - 1) / (self.stamps[-1] - self.stamps[0])
+
+    def report(self):
+        lat = np.array(self.latencies)
+        print(f"[STATS] frames={self.frames} fps={self.fps():.1f} "
+              f"p50_ms={np.percentile(lat, 50):.1f} p95_ms={np.percentile(lat, 95):.1f} "
+              f"max_ms={lat.max():.1f}", flush=True)
@@ -1,11 +1,18 @@
 # front.py
 import cv2
 import os
-import shutil
+import time
 import numpy as np
+import torch
 import mysql.connector
 from datetime import datetime
 from ultralytics import YOLO
+from phone_tracker import PhoneTracker, detect_phones
+from hand_crops import detect_phones_in_hands
+from letterbox import get_letterbox
+from concurrent_inference import LatencyStats, ModelRunner, split_threads
+from preview import PreviewPublisher
+from postprocess import ClipFinalizer
 
 # If running on the client, import paramiko + scp
 IS_CLIENT = False  # Change to True on client, False on host
@@ -37,8 +44,30 @@ FRAME_HEIGHT = 720
 POSE_MODEL_PATH = "yolov8n-pose.pt"
 # Mobile model (for mobile phone detection)
 MOBILE_MODEL_PATH = "yolo11n.pt"
+# Run the full phone detector every N frames; boxes are tracked with optical flow in between
+MOBILE_DETECT_EVERY = 5
+# Cascaded phone detection: only scan crops around the pose wrists instead of the whole frame
+MOBILE_HAND_CROPS = True
+HAND_CROP_SIZE = 256    # minimum crop side in pixels around each wrist
+HAND_CROP_IMGSZ = 512   # detector input size for the crops (upscales small hands)
+# Inference-resolution decoupling: letterbox the raw capture once at the model input
+# size and map keypoints/boxes back to FRAME_WIDTH x FRAME_HEIGHT; the full-size frame
+# is only used for drawing and recording. Both models share one tensor when the sizes match.
+DECOUPLED_INFERENCE = False
+POSE_IMGSZ = 640
+MOBILE_IMGSZ = 640
+# Run the pose and phone models concurrently on each frame, with the CPU threads
+# split between them so they don't oversubscribe the cores
+CONCURRENT_INFERENCE = False
+POSE_THREADS, MOBILE_THREADS = split_threads(pose_share=0.5)
+
+# Live MJPEG preview for the Run Cameras page (0 disables it); with HEADLESS=1
+# the local cv2.imshow window is skipped, e.g. when started by the supervisor
+PREVIEW_PORT = int(os.environ.get("PREVIEW_PORT", "0"))
+HEADLESS = os.environ.get("HEADLESS", "0") == "1"
 
 MEDIA_DIR = "../media/"
+REMOTE_MEDIA_DIR = "./AIInvigilator/media"  # on the host, when IS_CLIENT
 
 # Thresholds for events
 LEANING_THRESHOLD = 3      # consecutive frames needed for leaning
@@ -68,22 +97,24 @@ if IS_CLIENT:
 
     scp = SCPClient(ssh.get_transport())
 
-    db = mysql.connector.connect(
-        host=hostname,
-        port=3306,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME
-    )
+    db_host = hostname
 else:
     # Local DB if host
-    db = mysql.connector.connect(
-        host="localhost",
+    db_host = "localhost"
+
+
+def connect_db():
+    return mysql.connector.connect(
+        host=db_host,
+        port=3306,
         user=DB_USER,
         password=DB_PASSWORD,
-        database=DB_NAME
+        database=DB_NAME,
+        autocommit=True
     )
 
+
+db = connect_db()
 cursor = db.cursor()
 
 # ========================
@@ -268,6 +299,39 @@ def detect_passing_paper(wrists, keypoints_list):
 # ========================
 pose_model = YOLO(POSE_MODEL_PATH)
 mobile_model = YOLO(MOBILE_MODEL_PATH)
+phone_tracker = PhoneTracker(detect_every=MOBILE_DETECT_EVERY)
+
+def make_phone_detect_fn(person_keypoints, raw_frame=None, mobile_lb=None, mobile_input=None):
+    """Build this frame's phone detector for the tracker, according to the configured mode."""
+    if MOBILE_HAND_CROPS:
+        return lambda f: detect_phones_in_hands(mobile_model, f, person_keypoints,
+                                                HAND_CROP_SIZE, HAND_CROP_IMGSZ)
+    if DECOUPLED_INFERENCE:
+        return lambda f: mobile_lb.boxes(detect_phones(
+            mobile_model, mobile_input if mobile_input is not None else mobile_lb.tensor(raw_frame)))
+    return lambda f: detect_phones(mobile_model, f)
+
+def track_phones(frame, gray, detect_fn):
+    """Per-frame phone boxes from the tracker; detector errors count as no phone."""
+    try:
+        return phone_tracker.update(frame, detect_fn, gray)
+    except Exception as e:
+        print("Mobile detection error:", e)
+        return []
+
+if CONCURRENT_INFERENCE:
+    # Pose runs on the main thread, the phone model on its own runner thread
+    torch.set_num_threads(POSE_THREADS)
+    mobile_runner = ModelRunner("mobile", MOBILE_THREADS)
+latency_stats = LatencyStats()
+# The finalizer inserts each detection itself, on its own connection, once the clip is stored
+clip_finalizer = ClipFinalizer(
+    MEDIA_DIR, connect_db,
+    scp=scp if IS_CLIENT else None,
+    ssh=ssh if IS_CLIENT else None,
+    remote_media_dir=REMOTE_MEDIA_DIR,
+)
+preview = PreviewPublisher(PREVIEW_PORT) if PREVIEW_PORT else None
 
 # ========================
 # VIDEO SOURCE
@@ -312,14 +376,33 @@ hand_raise_video = None
 # ========================
 # MAIN LOOP
 # ========================
-    
+prev_person_keypoints = []
+
 try:  
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
-
-        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        frame_start = time.perf_counter()
+
+        if DECOUPLED_INFERENCE:
+            # Letterbox the raw capture straight to the model input size, before any overlays
+            pose_lb = get_letterbox(frame.shape, POSE_IMGSZ, (FRAME_WIDTH, FRAME_HEIGHT))
+            pose_input = pose_lb.tensor(frame)
+            if MOBILE_IMGSZ == POSE_IMGSZ:
+                mobile_lb, mobile_input = pose_lb, pose_input
+            else:
+                # Built lazily, only on frames where the phone detector actually runs
+                mobile_lb = get_letterbox(frame.shape, MOBILE_IMGSZ, (FRAME_WIDTH, FRAME_HEIGHT))
+                mobile_input = None
+            raw_frame = frame
+            # The recording frame is only resized if the camera ignored the requested size
+            if frame.shape[:2] != (FRAME_HEIGHT, FRAME_WIDTH):
+                frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        else:
+            frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        # Clean grayscale copy for the phone tracker, taken before any overlays are drawn
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
         # Overlay: date/time and lecture hall info
         now = datetime.now()
@@ -337,8 +420,28 @@ try:
         cv2.putText(frame, hall_text, (50, FRAME_HEIGHT - 50),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255,255,255), 2, cv2.LINE_AA)
 
+        if CONCURRENT_INFERENCE:
+            # Phones are detected on the mobile runner while pose runs here. The hand
+            # crops use the previous frame's wrists since this frame's pose isn't ready.
+            phone_future = mobile_runner.submit(
+                track_phones, frame, gray,
+                make_phone_detect_fn(prev_person_keypoints, raw_frame, mobile_lb, mobile_input)
+                if DECOUPLED_INFERENCE else make_phone_detect_fn(prev_person_keypoints))
+
         # YOLO pose inference for leaning & passing paper
-        results = pose_model(frame)
+        if DECOUPLED_INFERENCE:
+            results = pose_model(pose_input)
+        else:
+            results = pose_model(frame)
+
+        if CONCURRENT_INFERENCE:
+            # Wait for the phone model before anything is drawn on the frame it reads
+            phone_boxes = phone_future.result()
+        # Keypoint arrays per result, in recording-frame coordinates
+        pose_keypoints = []
+        for r in results:
+            kpts = r.keypoints.xy.cpu().numpy() if r.keypoints else []
+            pose_keypoints.append(pose_lb.points(kpts) if DECOUPLED_INFERENCE else kpts)
 
         # 1) Leaning Detection (process each person's keypoints)
         leaning_this_frame = False
@@ -351,8 +454,7 @@ try:
         wrist_positions = []
         all_keypoints = []
 
-        for r in results:
-            kpts = r.keypoints.xy.cpu().numpy() if r.keypoints else []
+        for kpts in pose_keypoints:
             if len(kpts) > 0:
                 all_keypoints.append(kpts)
                 # For passing detection, collect wrists (expecting at least 11 keypoints)
@@ -360,14 +462,17 @@ try:
                     if len(kp) >= 11:
                         wrist_positions.append([kp[9], kp[10]])
 
+        # Flat list of every person's keypoints, used for the hand-crop phone cascade
+        person_keypoints = [kp for kpts in all_keypoints for kp in kpts]
+        prev_person_keypoints = person_keypoints
+
         passing_detected, close_pairs = detect_passing_paper(wrist_positions, all_keypoints)
         if passing_detected:
             passing_this_frame = True
 
         # Separate pass for turning back first, then leaning and hand raise
         # Check turning back first to avoid false leaning detection
-        for r in results:
-            kpts = r.keypoints.xy.cpu().numpy() if r.keypoints else []
+        for kpts in pose_keypoints:
             for kp in kpts:
                 if is_turning_back(kp):
                     turning_this_frame = True
@@ -453,21 +558,9 @@ try:
                     )
                     row = cursor.fetchone()
                     hall_id = row[0] if row else None
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
                     local_temp = "output_leaning.mp4"
-                    proof_filename = f"output_leaning_{timestamp}.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    val = (date_db, time_db, LEANING_ACTION, proof_filename, hall_id, False)
-                    cursor.execute(sql, val)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, LEANING_ACTION, hall_id)
                 else:
                     if lean_recording and lean_video:
                         lean_video.release()
@@ -506,21 +599,9 @@ try:
                     )
                     row = cursor.fetchone()
                     hall_id = row[0] if row else None
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
                     local_temp = "output_passingpaper.mp4"
-                    proof_filename = f"output_passingpaper_{timestamp}.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    val = (date_db, time_db, PASSING_ACTION, proof_filename, hall_id, False)
-                    cursor.execute(sql, val)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, PASSING_ACTION, hall_id)
                 else:
                     if passing_recording and passing_video:
                         passing_video.release()
@@ -559,21 +640,9 @@ try:
                     )
                     row = cursor.fetchone()
                     hall_id = row[0] if row else None
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
                     local_temp = "output_turningback.mp4"
-                    proof_filename = f"output_turningback_{timestamp}.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    val = (date_db, time_db, TURNING_ACTION, proof_filename, hall_id, False)
-                    cursor.execute(sql, val)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, TURNING_ACTION, hall_id)
                 else:
                     if turning_recording and turning_video:
                         turning_video.release()
@@ -612,21 +681,9 @@ try:
                     )
                     row = cursor.fetchone()
                     hall_id = row[0] if row else None
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
                     local_temp = "output_handraise.mp4"
-                    proof_filename = f"output_handraise_{timestamp}.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    val = (date_db, time_db, HAND_RAISE_ACTION, proof_filename, hall_id, False)
-                    cursor.execute(sql, val)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, HAND_RAISE_ACTION, hall_id)
                 else:
                     if hand_raise_recording and hand_raise_video:
                         hand_raise_video.release()
@@ -640,22 +697,19 @@ try:
             hand_raise_video.write(frame)
 
         # 8) MOBILE PHONE DETECTION
-        try:
-            mobile_results = mobile_model(frame)
-        except Exception as e:
-            print("Mobile detection error:", e)
-            mobile_results = []
-        mobile_detected = False
-        # Look through detection boxes for mobile (class 67)
-        for m_res in mobile_results:
-            if m_res.boxes is not None:
-                for box in m_res.boxes:
-                    if int(box.cls) == 67:
-                        mobile_detected = True
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        # Draw orange rectangle and label for mobile detection
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0,165,255), 2)
-                        cv2.putText(frame, "Mobile", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
+        # The full detector only runs every MOBILE_DETECT_EVERY frames (or early when
+        # tracking is lost); the tracker still yields a per-frame set of phone boxes.
+        if not CONCURRENT_INFERENCE:
+            if DECOUPLED_INFERENCE:
+                detect_fn = make_phone_detect_fn(person_keypoints, raw_frame, mobile_lb, mobile_input)
+            else:
+                detect_fn = make_phone_detect_fn(person_keypoints)
+            phone_boxes = track_phones(frame, gray, detect_fn)
+        mobile_detected = len(phone_boxes) > 0
+        for x1, y1, x2, y2 in phone_boxes:
+            # Draw orange rectangle and label for mobile detection
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0,165,255), 2)
+            cv2.putText(frame, "Mobile", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
         if mobile_detected:
             if not mobile_in_progress:
                 mobile_in_progress = True
@@ -677,8 +731,6 @@ try:
                     if mobile_recording and mobile_video:
                         mobile_video.release()
                     now_save = datetime.now()
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
-                    proof_filename = f"output_mobiledetection_{timestamp}.mp4"
                     date_db = now_save.date().isoformat()
                     time_db = now_save.time().strftime('%H:%M:%S')
                     cursor.execute(
@@ -688,18 +740,8 @@ try:
                     row = cursor.fetchone()
                     hall_id = row[0] if row else None
                     local_temp = "output_mobiledetection.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    val = (date_db, time_db, ACTION_MOBILE, proof_filename, hall_id, False)
-                    cursor.execute(sql, val)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, ACTION_MOBILE, hall_id)
                 else:
                     if mobile_recording and mobile_video:
                         mobile_video.release()
@@ -709,10 +751,15 @@ try:
                 mobile_recording = False
                 mobile_video = None
 
+        latency_stats.add(frame_start)
+
         # 9) Display the frame and check for quit key
-        cv2.imshow("Exam Monitoring - All Actions (Leaning, Turning, Hand Raise, Passing, Mobile)", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+        if preview:
+            preview.submit(frame)
+        if not HEADLESS:
+            cv2.imshow("Exam Monitoring - All Actions (Leaning, Turning, Hand Raise, Passing, Mobile)", frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
 
 except KeyboardInterrupt:
     print("Received keybaord interrupt; shutting down...")
@@ -720,6 +767,10 @@ except KeyboardInterrupt:
 finally:
     # Cleanup
     cap.release()
+    if CONCURRENT_INFERENCE:
+        mobile_runner.shutdown()
+    if preview:
+        preview.close()
     if lean_recording and lean_video:
         lean_video.release()
     if passing_recording and passing_video:
@@ -730,6 +781,7 @@ finally:
         hand_raise_video.release()
     if mobile_recording and mobile_video:
         mobile_video.release()
+    clip_finalizer.shutdown()
     if IS_CLIENT:
         scp.close()
         ssh.close()
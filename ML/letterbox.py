@@ -0,0 +1,68 @@
+# letterbox.py
+import cv2
+import numpy as np
+import torch
+
+
+class Letterbox:
+    """
+    One-shot letterbox preprocessing for YOLO.
+
+    Resizes a source frame straight to the model input size (keeping the
+    aspect ratio and padding to the stride) and builds the BCHW float tensor
+    that ultralytics accepts as-is, so the model does not letterbox again.
+    The inverse mapping takes keypoints and boxes from model-input
+    coordinates to the recording frame size `out_size` (width, height).
+    """
+
+    def __init__(self, src_shape, imgsz=640, out_size=None, stride=32):
+        src_h, src_w = src_shape[:2]
+        self.src_shape = (src_h, src_w)
+        self.imgsz = imgsz
+        self.ratio = min(imgsz / src_h, imgsz / src_w)
+        self.new_w = int(round(src_w * self.ratio))
+        self.new_h = int(round(src_h * self.ratio))
+        pad_w = (stride - self.new_w % stride) % stride
+        pad_h = (stride - self.new_h % stride) % stride
+        self.left, self.top = pad_w // 2, pad_h // 2
+        self.right, self.bottom = pad_w - self.left, pad_h - self.top
+        out_w, out_h = out_size if out_size else (src_w, src_h)
+        self.scale = np.array([out_w / src_w, out_h / src_h], dtype=np.float32)
+
+    def tensor(self, frame):
+        """Letterbox a BGR frame into a (1, 3, H, W) RGB float tensor in [0, 1]."""
+        img = frame
+        if (self.new_w, self.new_h) != (frame.shape[1], frame.shape[0]):
+            img = cv2.resize(frame, (self.new_w, self.new_h), interpolation=cv2.INTER_LINEAR)
+        img = cv2.copyMakeBorder(img, self.top, self.bottom, self.left, self.right,
+                                 cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        return torch.from_numpy(np.ascontiguousarray(img)).float().div_(255.0).unsqueeze(0)
+
+    def points(self, xy):
+        """Map (..., 2) keypoints to recording coordinates; undetected (0, 0) points stay at zero."""
+        xy = np.asarray(xy, dtype=np.float32)
+        if xy.size == 0:
+            return xy
+        visible = (xy[..., 0] > 0) | (xy[..., 1] > 0)
+        mapped = (xy - np.array([self.left, self.top], dtype=np.float32)) / self.ratio * self.scale
+        return np.where(visible[..., None], mapped, 0.0)
+
+    def boxes(self, boxes):
+        """Map (x1, y1, x2, y2) boxes to integer recording coordinates."""
+        mapped = []
+        for x1, y1, x2, y2 in boxes:
+            (mx1, my1), (mx2, my2) = self.points([[x1, y1], [x2, y2]])
+            mapped.append((max(0, int(mx1)), max(0, int(my1)), int(mx2), int(my2)))
+        return mapped
+
+
+_letterbox_cache = {}
+
+
+def get_letterbox(src_shape, imgsz, out_size):
+    """Letterbox transforms only depend on the frame shape, so reuse them across frames."""
+    key = (tuple(src_shape[:2]), imgsz, tuple(out_size))
+    if key not in _letterbox_cache:
+        _letterbox_cache[key] = Letterbox(src_shape, imgsz, out_size)
+    return _letterbox_cache[key]
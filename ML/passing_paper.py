@@ -204,7 +204,8 @@ while cap.isOpened():
             now_save = datetime.now()
             date_db = now_save.date().isoformat()
             time_db = now_save.time().strftime('%H:%M:%S')
-            timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
+            # Microseconds keep two clips from the same second apart (proof is unique)
+            timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S-%f")
             proof_filename = f"output_{timestamp}.mp4"
 
             # Copy to local media folder
@@ -230,8 +231,12 @@ while cap.isOpened():
                 VALUES (%s, %s, %s, %s, %s)
             """
             val = (date_db, time_db, ACTION_NAME, proof_filename, hall_id)
-            cursor.execute(sql, val)
-            db.commit()
+            try:
+                cursor.execute(sql, val)
+                db.commit()
+            except mysql.connector.IntegrityError as e:
+                # Keep capturing; the unreferenced clip is left for the orphan scan
+                print(f"[ERROR] Could not log detection {proof_filename}: {e}")
 
             malpractice = 0
             video_control = 0
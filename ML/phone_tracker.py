@@ -0,0 +1,124 @@
+# phone_tracker.py
+import cv2
+import numpy as np
+
+# COCO class id used by the YOLO detector for "cell phone"
+PHONE_CLASS_ID = 67
+
+# Lucas-Kanade parameters for the sparse optical flow between frames
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+)
+
+
+def detect_phones(model, frame):
+    """
+    Run the full object detector on a frame and return the phone boxes
+    as a list of integer (x1, y1, x2, y2) tuples.
+    """
+    boxes = []
+    for result in model(frame):
+        if result.boxes is None:
+            continue
+        for box in result.boxes:
+            if int(box.cls) == PHONE_CLASS_ID:
+                boxes.append(tuple(map(int, box.xyxy[0])))
+    return boxes
+
+
+class PhoneTracker:
+    """
+    Runs the phone detector every `detect_every` frames and carries the boxes
+    across the frames in between with pyramidal Lucas-Kanade optical flow.
+    The detector is re-run early as soon as any tracked box loses too many of
+    its feature points (forward-backward check), so a lost phone is picked up
+    again on the next frame instead of at the next scheduled run.
+    """
+
+    def __init__(self, detect_every=5, max_points=20, min_track_ratio=0.5, max_fb_error=1.5):
+        self.detect_every = max(1, int(detect_every))
+        self.max_points = max_points
+        self.min_track_ratio = min_track_ratio
+        self.max_fb_error = max_fb_error
+        self.prev_gray = None
+        self.tracks = []  # list of [box, points] pairs
+        self.frames_since_detect = self.detect_every  # force a detection on the first frame
+
+    def update(self, frame, detect_fn, gray=None):
+        """
+        Return the phone boxes for this frame.
+        `detect_fn(frame)` must return a list of (x1, y1, x2, y2) boxes.
+        `gray` may be passed in when the caller already has a clean
+        grayscale copy of the frame (taken before any overlays are drawn).
+        """
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        need_detect = self.prev_gray is None or self.frames_since_detect >= self.detect_every
+        if not need_detect and self.tracks:
+            tracked = self._track(self.prev_gray, gray)
+            if tracked is None:
+                # Tracking confidence dropped; fall back to the full detector now
+                need_detect = True
+            else:
+                self.tracks = tracked
+
+        if need_detect:
+            boxes = detect_fn(frame)
+            self.tracks = [[box, self._seed_points(gray, box)] for box in boxes]
+            self.frames_since_detect = 0
+
+        self.frames_since_detect += 1
+        self.prev_gray = gray
+        return [box for box, _ in self.tracks]
+
+    def _seed_points(self, gray, box):
+        """Pick trackable corners inside a box, falling back to a small grid."""
+        x1, y1, x2, y2 = box
+        roi = gray[max(0, y1):y2, max(0, x1):x2]
+        points = None
+        if roi.size > 0:
+            points = cv2.goodFeaturesToTrack(roi, maxCorners=self.max_points,
+                                             qualityLevel=0.01, minDistance=3)
+        if points is not None and len(points) >= 4:
+            points = points.reshape(-1, 2) + np.array([max(0, x1), max(0, y1)], dtype=np.float32)
+        else:
+            # Phones are often flat dark rectangles with few corners; a 3x3 grid
+            # still lets the flow follow the box as a whole.
+            xs = np.linspace(x1, x2, 5)[1:4]
+            ys = np.linspace(y1, y2, 5)[1:4]
+            points = np.array([[x, y] for y in ys for x in xs], dtype=np.float32)
+        return points.astype(np.float32)
+
+    def _track(self, prev_gray, gray):
+        """
+        Move every box by the median flow of its surviving points.
+        Returns None if any box is no longer tracked reliably.
+        """
+        all_points = np.concatenate([pts for _, pts in self.tracks]).reshape(-1, 1, 2)
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, all_points, None, **LK_PARAMS)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, new_points, None, **LK_PARAMS)
+        fb_error = np.linalg.norm(all_points - back_points, axis=2).ravel()
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+        new_points = new_points.reshape(-1, 2)
+
+        height, width = gray.shape[:2]
+        tracked = []
+        start = 0
+        for box, pts in self.tracks:
+            end = start + len(pts)
+            box_good = good[start:end]
+            if box_good.mean() < self.min_track_ratio:
+                return None
+            old_pts = all_points[start:end].reshape(-1, 2)[box_good]
+            moved_pts = new_points[start:end][box_good]
+            dx, dy = np.median(moved_pts - old_pts, axis=0)
+            x1, y1, x2, y2 = box
+            x1, x2 = int(np.clip(round(x1 + dx), 0, width - 1)), int(np.clip(round(x2 + dx), 0, width - 1))
+            y1, y2 = int(np.clip(round(y1 + dy), 0, height - 1)), int(np.clip(round(y2 + dy), 0, height - 1))
+            if x2 > x1 and y2 > y1:
+                tracked.append([(x1, y1, x2, y2), moved_pts])
+            start = end
+        return tracked
@@ -0,0 +1,259 @@
+# postprocess.py
+import hashlib
+import os
+import posixpath
+import shlex
+import shutil
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error as DBError, IntegrityError
+
+FFMPEG = shutil.which("ffmpeg")
+PROOF_ROOT = "proofs"
+DB_ATTEMPTS = 5     # tries at inserting a detection, reconnecting in between
+DB_RETRY_DELAY = 2  # seconds, doubled after each failed try
+
+INSERT_DETECTION = """
+    INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id, verified)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+RECORDED_DETECTION = """
+    SELECT id FROM app_malpraticedetection
+    WHERE proof = %s AND date = %s AND time = %s AND malpractice = %s AND lecture_hall_id <=> %s
+"""
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def proof_path(date_iso, hall_id, digest, ext=".mp4"):
+    """
+    Where a clip lives under the media root: proofs/YYYY/MM/DD/hall-<id>/<hh>/<sha256>.mp4.
+    Must match app/proof_storage.py:proof_path.
+    """
+    year, month, day = date_iso.split("-")
+    hall = f"hall-{hall_id}" if hall_id else "hall-none"
+    return posixpath.join(PROOF_ROOT, year, month, day, hall, digest[:2], digest + ext)
+
+
+def link_or_copy(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Links not supported: copy under a temporary name
+        shutil.copy2(src, dest + ".part")
+        os.replace(dest + ".part", dest)
+
+
+class ClipFinalizer:
+    """
+    Turns a raw OpenCV recording into a browser-friendly proof clip, stores
+    it and records the detection.
+
+    cv2.VideoWriter stamps every clip as 30 FPS and leaves the moov atom at
+    the end of the file, so playback is too fast and can't start until the
+    whole file has downloaded. Each clip is re-encoded here to H.264
+    (yuv420p, capped bitrate) at the frame rate the detection loop
+    actually measured, with `+faststart` so the index comes first.
+
+    The clip is then stored by content under proof_path() (date and hall
+    shards, SHA-256 name), so two detections in the same second can't
+    overwrite each other and no directory grows without bound. Only then is
+    the detection row inserted, so a row never points at a clip that isn't
+    there. Every detection gets its row: proof is unique, so when an
+    identical clip is already recorded the new row gets its own name,
+    hard-linked to the stored file so the bytes are written once (as
+    app/proof_storage.py does when it migrates old clips).
+
+    Work runs on one background thread with its own DB connection (from
+    `connect_db`), so the detection loop only pays for a file rename.
+    Without ffmpeg on the PATH, clips are stored unchanged.
+
+    A detection is not given up lightly: the INSERT is retried over a fresh
+    connection, a failed upload to the media host still records the row,
+    and a clip whose row could not be written is kept on disk (and logged)
+    rather than deleted.
+    """
+
+    def __init__(self, media_dir, connect_db, scp=None, ssh=None, remote_media_dir=None,
+                 bitrate="800k", maxrate="1200k", preset="veryfast"):
+        self.media_dir = media_dir
+        self.connect_db = connect_db
+        self.db = None
+        self.scp = scp
+        self.ssh = ssh
+        self.remote_media_dir = remote_media_dir
+        self.bitrate = bitrate
+        self.maxrate = maxrate
+        self.preset = preset
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-finalizer")
+        if not FFMPEG:
+            print("[WARN] ffmpeg not found; proof clips will be saved without faststart/transcoding.")
+
+    def finalize(self, local_temp, fps, date_db, time_db, malpractice, hall_id):
+        """
+        Queue `local_temp` (already released by its VideoWriter) to be stored
+        and recorded as a detection. The raw file is moved aside first, so the
+        next recording can reuse its name.
+        """
+        staged = f"{os.path.splitext(local_temp)[0]}_{uuid.uuid4().hex[:8]}.raw.mp4"
+        os.replace(local_temp, staged)
+        return self.executor.submit(self._run, staged, fps, (date_db, time_db, malpractice, hall_id))
+
+    def _transcode(self, src, dest, fps):
+        cmd = [FFMPEG, "-y", "-loglevel", "error"]
+        if fps and fps > 0:
+            # Input-side -r re-times the frames to the rate they were really captured at
+            cmd += ["-r", f"{fps:.2f}"]
+        cmd += [
+            "-i", src,
+            "-an",
+            "-c:v", "libx264", "-preset", self.preset, "-profile:v", "main",
+            "-pix_fmt", "yuv420p",
+            "-b:v", self.bitrate, "-maxrate", self.maxrate, "-bufsize", self.maxrate,
+            "-movflags", "+faststart",
+            "-f", "mp4", dest,
+        ]
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+    def _store(self, clip, date_db, hall_id):
+        """Move a finished clip to its content-addressed path; returns the path relative to the media root."""
+        proof = proof_path(date_db, hall_id, file_digest(clip))
+        dest_path = os.path.join(self.media_dir, *proof.split("/"))
+        if os.path.exists(dest_path):
+            os.remove(clip)  # same content already stored; _record gives the row its own name
+        else:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            os.replace(clip, dest_path)
+        return proof
+
+    def _upload(self, proof):
+        """Copy a stored clip to the media host, if there is one. A failure is logged, not raised."""
+        if not (self.scp and self.remote_media_dir):
+            return
+        local_path = os.path.join(self.media_dir, *proof.split("/"))
+        remote_dest = posixpath.join(self.remote_media_dir, proof)
+        try:
+            self._remote_makedirs(posixpath.dirname(remote_dest))
+            self.scp.put(local_path, remote_dest)
+        except Exception as e:
+            print(f"[ERROR] Could not upload {proof} to the media host, kept at {local_path}: {e}")
+
+    def _remote_makedirs(self, path):
+        # SFTP mkdir works whatever shell the server has
+        sftp = self.ssh.open_sftp()
+        try:
+            current = ""
+            for part in path.split("/"):
+                current = posixpath.join(current, part) if current else part
+                try:
+                    sftp.stat(current)
+                except IOError:
+                    sftp.mkdir(current)
+        finally:
+            sftp.close()
+
+    def _link(self, proof):
+        """
+        A new name for the already stored clip `proof`, linked to the same
+        bytes; returns it relative to the media root.
+        """
+        base, ext = posixpath.splitext(proof)
+        alias = f"{base}-{uuid.uuid4().hex[:8]}{ext}"
+        local_path = os.path.join(self.media_dir, *alias.split("/"))
+        link_or_copy(os.path.join(self.media_dir, *proof.split("/")), local_path)
+        if self.scp and self.remote_media_dir:
+            src = posixpath.join(self.remote_media_dir, proof)
+            dest = posixpath.join(self.remote_media_dir, alias)
+            _, stdout, _ = self.ssh.exec_command(f"ln {shlex.quote(src)} {shlex.quote(dest)}")
+            if stdout.channel.recv_exit_status() != 0:
+                self.scp.put(local_path, dest)  # no POSIX ln on the server: send a copy
+        return alias
+
+    def _record(self, proof, detection):
+        """Insert the detection, reconnecting and retrying on database errors."""
+        delay = DB_RETRY_DELAY
+        linked = []  # a linked name made by one try is reused by the next
+        for attempt in range(1, DB_ATTEMPTS + 1):
+            try:
+                return self._insert(proof, detection, linked, retry=attempt > 1)
+            except DBError as e:
+                if attempt == DB_ATTEMPTS:
+                    raise
+                print(f"[WARN] Could not record {proof} (attempt {attempt}), retrying in {delay}s: {e}")
+                try:
+                    self.db.close()
+                except Exception:
+                    pass
+                self.db = None
+                time.sleep(delay)
+                delay *= 2
+
+    def _insert(self, proof, detection, linked, retry=False):
+        date_db, time_db, malpractice, hall_id = detection
+        if self.db is None or not self.db.is_connected():
+            self.db = self.connect_db()
+        cursor = self.db.cursor()
+        try:
+            if retry:
+                # The connection may have dropped after the last try's INSERT went through
+                cursor.execute(RECORDED_DETECTION, (linked[0] if linked else proof, date_db, time_db,
+                                                    malpractice, hall_id))
+                if cursor.fetchone():
+                    return
+            cursor.execute("SELECT id FROM app_malpraticedetection WHERE proof=%s LIMIT 1", (proof,))
+            if cursor.fetchone() is None:
+                try:
+                    cursor.execute(INSERT_DETECTION, (date_db, time_db, malpractice, proof, hall_id, False))
+                    self.db.commit()
+                    return
+                except IntegrityError:
+                    pass  # another camera recorded the same clip in between
+            if not linked:
+                linked.append(self._link(proof))
+            cursor.execute(INSERT_DETECTION, (date_db, time_db, malpractice, linked[0], hall_id, False))
+            self.db.commit()
+        finally:
+            cursor.close()
+
+    def _run(self, staged, fps, detection):
+        # Encode inside the media dir, so storing it is a rename on the same disk
+        tmp_dest = os.path.join(self.media_dir, os.path.basename(staged) + ".part.mp4")
+        try:
+            if FFMPEG:
+                try:
+                    self._transcode(staged, tmp_dest, fps)
+                except subprocess.CalledProcessError as e:
+                    print(f"[WARN] ffmpeg failed for {staged}, keeping the raw clip: {e.stderr.strip()}")
+                    shutil.copy(staged, tmp_dest)
+            else:
+                shutil.copy(staged, tmp_dest)
+            date_db, time_db, malpractice, hall_id = detection
+            proof = self._store(tmp_dest, date_db, hall_id)
+        except Exception as e:
+            # Keep the raw recording; nothing else of this detection exists yet
+            print(f"[ERROR] Could not store proof clip, raw recording kept at {staged}: {e}")
+            if os.path.exists(tmp_dest):
+                os.remove(tmp_dest)
+            return
+        os.remove(staged)
+        self._upload(proof)
+        try:
+            self._record(proof, detection)
+        except Exception as e:
+            # The clip stays under its proof name; the orphan scan lists it
+            print(f"[ERROR] Could not record detection {detection} for {proof}, clip kept: {e}")
+
+    def shutdown(self):
+        """Wait for queued clips so none are lost on exit."""
+        self.executor.shutdown(wait=True)
+        if self.db is not None:
+            self.db.close()
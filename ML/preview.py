@@ -0,0 +1,136 @@
+# preview.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = "frame"
+
+
+class PreviewPublisher:
+    """
+    Live MJPEG preview of a camera worker, served at /stream.mjpg.
+
+    The detection loop only hands its latest annotated frame to `submit`,
+    which is a reference swap and returns immediately. Downscaling and JPEG
+    encoding run on a separate thread, and only while at least one viewer
+    is connected, so an unwatched camera pays nothing. Each frame is encoded
+    once and shared by all viewers; as more viewers join, the frame rate
+    and JPEG quality step down to keep bandwidth bounded.
+    """
+
+    def __init__(self, port, host="0.0.0.0", max_width=640, max_fps=10, min_fps=2,
+                 max_quality=75, min_quality=40):
+        self.max_width = max_width
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+
+        self.viewers = 0
+        self.pending = None       # latest raw frame from the detection loop
+        self.jpeg = None          # latest encoded frame shared by all viewers
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.running = True
+
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._encode_loop, daemon=True).start()
+        print(f"[Preview] Serving MJPEG preview on port {port}")
+
+    def submit(self, frame):
+        """Offer the latest frame; dropped when nobody is watching."""
+        if self.viewers == 0:
+            return
+        with self.cond:
+            self.pending = frame
+            self.cond.notify_all()
+
+    def _settings(self):
+        """Frame rate and JPEG quality for the current number of viewers."""
+        extra = max(0, self.viewers - 1)
+        fps = max(self.min_fps, self.max_fps / (1 + 0.5 * extra))
+        quality = max(self.min_quality, self.max_quality - 10 * extra)
+        return fps, quality
+
+    def _encode_loop(self):
+        last = 0.0
+        while self.running:
+            with self.cond:
+                while self.running and (self.viewers == 0 or self.pending is None):
+                    self.cond.wait(timeout=1.0)
+                frame, self.pending = self.pending, None
+            if frame is None:
+                continue
+
+            fps, quality = self._settings()
+            wait = 1.0 / fps - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            last = time.monotonic()
+
+            height, width = frame.shape[:2]
+            if width > self.max_width:
+                frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                                   interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if not ok:
+                continue
+            with self.cond:
+                self.jpeg = buf.tobytes()
+                self.seq += 1
+                self.cond.notify_all()
+
+    def _stream(self, wfile):
+        """Write every newly encoded frame to one viewer until it disconnects."""
+        with self.cond:
+            self.viewers += 1
+            # A new viewer gets the last frame right away, if there is one
+            seen = self.seq if self.jpeg is None else -1
+        try:
+            while self.running:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.seq != seen or not self.running, timeout=5.0)
+                    if self.seq == seen:
+                        continue
+                    seen, jpeg = self.seq, self.jpeg
+                wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                wfile.write(jpeg)
+                wfile.write(b"\r\n")
+                wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.cond:
+                self.viewers -= 1
+
+    def _handler(self):
+        publisher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/stream.mjpg":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache, private")
+                self.send_header("Pragma", "no-cache")
+                self.end_headers()
+                publisher._stream(self.wfile)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,92 @@
+# tiling.py
+import cv2
+import numpy as np
+
+from phone_tracker import PHONE_CLASS_ID
+
+
+def make_tiles(frame_shape, grid=(2, 2), overlap=0.2):
+    """
+    Split a frame into a (cols, rows) grid of overlapping tiles.
+    Returns a list of (x1, y1, x2, y2) regions; `overlap` is the fraction
+    of a tile shared with its neighbour.
+    """
+    height, width = frame_shape[:2]
+    cols, rows = grid
+    tile_w = int(np.ceil(width / (cols - (cols - 1) * overlap)))
+    tile_h = int(np.ceil(height / (rows - (rows - 1) * overlap)))
+    step_x = (width - tile_w) / (cols - 1) if cols > 1 else 0
+    step_y = (height - tile_h) / (rows - 1) if rows > 1 else 0
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            x1 = int(round(c * step_x))
+            y1 = int(round(r * step_y))
+            tiles.append((x1, y1, min(x1 + tile_w, width), min(y1 + tile_h, height)))
+    return tiles
+
+
+def _nms(boxes, scores, iou_threshold):
+    """NMS over xyxy boxes; returns the kept indices, best score first."""
+    if not boxes:
+        return []
+    xywh = [[x1, y1, x2 - x1, y2 - y1] for x1, y1, x2, y2 in boxes]
+    return list(np.array(cv2.dnn.NMSBoxes(xywh, scores, 0.0, iou_threshold)).reshape(-1))
+
+
+def same_person(kp_a, kp_b, max_dist):
+    """Two skeletons are the same person if their shared visible keypoints coincide."""
+    visible = (kp_a[:, 0] > 0) & (kp_b[:, 0] > 0)
+    if visible.sum() < 3:
+        return False
+    return np.median(np.linalg.norm(kp_a[visible] - kp_b[visible], axis=1)) < max_dist
+
+
+def tiled_pose(model, frame, tiles, iou_threshold=0.5, max_kp_dist=15):
+    """
+    Run the pose model on all tiles as one batch and stitch the people back
+    into frame coordinates. Duplicates from overlapping tiles are removed
+    with box NMS, then skeletons cut by a tile edge (low IoU with the full
+    detection) are dropped when their keypoints coincide with a kept one.
+    Returns a list of (17, 2) keypoint arrays, like `keypoints.xy` per person.
+    """
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    boxes, scores, people = [], [], []
+    for (ox, oy, _, _), result in zip(tiles, model(crops)):
+        if result.boxes is None or result.keypoints is None:
+            continue
+        tile_boxes = result.boxes.xyxy.cpu().numpy()
+        tile_scores = result.boxes.conf.cpu().numpy()
+        for box, score, kp in zip(tile_boxes, tile_scores, result.keypoints.xy.cpu().numpy()):
+            kp = kp.copy()
+            visible = kp[:, 0] > 0
+            kp[visible] += (ox, oy)  # invisible keypoints stay at (0, 0)
+            boxes.append([box[0] + ox, box[1] + oy, box[2] + ox, box[3] + oy])
+            scores.append(float(score))
+            people.append(kp)
+
+    kept = []
+    # Most complete skeletons first so partial, edge-cut duplicates are the ones dropped
+    for i in sorted(_nms(boxes, scores, iou_threshold), key=lambda i: -(people[i][:, 0] > 0).sum()):
+        if not any(same_person(people[i], people[j], max_kp_dist) for j in kept):
+            kept.append(i)
+    return [people[i] for i in kept]
+
+
+def tiled_phones(model, frame, tiles, iou_threshold=0.5):
+    """
+    Run the phone detector on all tiles as one batch and merge the boxes
+    across tiles with NMS. Returns integer (x1, y1, x2, y2) tuples.
+    """
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    boxes, scores = [], []
+    for (ox, oy, _, _), result in zip(tiles, model(crops)):
+        if result.boxes is None:
+            continue
+        for box in result.boxes:
+            if int(box.cls) != PHONE_CLASS_ID:
+                continue
+            x1, y1, x2, y2 = map(float, box.xyxy[0])
+            boxes.append([x1 + ox, y1 + oy, x2 + ox, y2 + oy])
+            scores.append(float(box.conf))
+    return [tuple(int(v) for v in boxes[i]) for i in _nms(boxes, scores, iou_threshold)]
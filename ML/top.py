@@ -143,7 +143,8 @@ try:
                         out.release()
 
                     now_save = datetime.now()
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
+                    # Microseconds keep two clips from the same second apart (proof is unique)
+                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S-%f")
                     proof_filename = f"output_{timestamp}.mp4"
                     date_db = now_save.date().isoformat()
                     time_db = now_save.time().strftime('%H:%M:%S')
@@ -171,8 +172,12 @@ try:
                         VALUES (%s, %s, %s, %s, %s)
                     """
                     values = (date_db, time_db, ACTION_NAME, proof_filename, hall_id)
-                    cursor.execute(sql, values)
-                    db.commit()
+                    try:
+                        cursor.execute(sql, values)
+                        db.commit()
+                    except mysql.connector.IntegrityError as e:
+                        # Keep capturing; the unreferenced clip is left for the orphan scan
+                        print(f"[ERROR] Could not log detection {proof_filename}: {e}")
                 else:
                     if video_control and out is not None:
                         out.release()
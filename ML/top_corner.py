@@ -1,11 +1,19 @@
 # top_corner.py
 import cv2
 import os
-import shutil
+import time
 import numpy as np
+import torch
 import mysql.connector
 from datetime import datetime
 from ultralytics import YOLO
+from phone_tracker import PhoneTracker, detect_phones
+from hand_crops import detect_phones_in_hands
+from tiling import make_tiles, tiled_pose, tiled_phones
+from letterbox import get_letterbox
+from concurrent_inference import LatencyStats, ModelRunner, split_threads
+from preview import PreviewPublisher
+from postprocess import ClipFinalizer
 
 # If running on the client, import paramiko and scp
 IS_CLIENT = False  # Set True on client, False on host
@@ -41,9 +49,39 @@ TURNING_THRESHOLD = 5
 MOBILE_MODEL_PATH = "yolo11n.pt"
 ACTION_NAME = "Mobile Phone Detected"
 MOBILE_THRESHOLD = 3
+# Run the full phone detector every N frames; boxes are tracked with optical flow in between
+MOBILE_DETECT_EVERY = 5
+# Cascaded phone detection: only scan crops around the pose wrists instead of the whole frame
+MOBILE_HAND_CROPS = True
+HAND_CROP_SIZE = 256    # minimum crop side in pixels around each wrist
+HAND_CROP_IMGSZ = 512   # detector input size for the crops (upscales small hands)
+
+# Tiled inference for wide halls: run the models on overlapping tiles so distant
+# students keep more pixels. The grid is (cols, rows) and can be set per camera,
+# e.g. TILED_INFERENCE=1 TILE_GRID=3x2 python top_corner.py
+USE_TILED_INFERENCE = os.environ.get("TILED_INFERENCE", "0") == "1"
+TILE_GRID = tuple(int(v) for v in os.environ.get("TILE_GRID", "2x2").split("x"))
+TILE_OVERLAP = 0.2
+
+# Inference-resolution decoupling: letterbox the raw capture once at the model input
+# size and map keypoints/boxes back to FRAME_WIDTH x FRAME_HEIGHT; the full-size frame
+# is only used for drawing and recording. Both models share one tensor when the sizes match.
+DECOUPLED_INFERENCE = False
+POSE_IMGSZ = 640
+MOBILE_IMGSZ = 640
+# Run the pose and phone models concurrently on each frame, with the CPU threads
+# split between them so they don't oversubscribe the cores
+CONCURRENT_INFERENCE = False
+POSE_THREADS, MOBILE_THREADS = split_threads(pose_share=0.5)
+
+# Live MJPEG preview for the Run Cameras page (0 disables it); with HEADLESS=1
+# the local cv2.imshow window is skipped, e.g. when started by the supervisor
+PREVIEW_PORT = int(os.environ.get("PREVIEW_PORT", "0"))
+HEADLESS = os.environ.get("HEADLESS", "0") == "1"
 
 # Media directory for saving video proofs
 MEDIA_DIR = "../media/"
+REMOTE_MEDIA_DIR = "./AIInvigilator/media"  # on the host, when IS_CLIENT
 
 # ========================
 # UTILITY: Turning Detection Checker
@@ -81,22 +119,24 @@ if IS_CLIENT:
     ssh.connect(hostname, port=22, username=username, password=password_ssh)
     scp = SCPClient(ssh.get_transport())
 
-    db = mysql.connector.connect(
-        host=hostname,
-        port=3306,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME
-    )
+    db_host = hostname
 else:
-    # Local DB
-    db = mysql.connector.connect(
-        host="localhost",
+    # Local DB if host
+    db_host = "localhost"
+
+
+def connect_db():
+    return mysql.connector.connect(
+        host=db_host,
+        port=3306,
         user=DB_USER,
         password=DB_PASSWORD,
-        database=DB_NAME
+        database=DB_NAME,
+        autocommit=True
     )
 
+
+db = connect_db()
 cursor = db.cursor()
 
 # ========================
@@ -106,6 +146,41 @@ cursor = db.cursor()
 pose_model = YOLO(POSE_MODEL_PATH)
 # Mobile detection model
 mobile_model = YOLO(MOBILE_MODEL_PATH)
+phone_tracker = PhoneTracker(detect_every=MOBILE_DETECT_EVERY)
+
+def make_phone_detect_fn(person_keypoints, raw_frame=None, mobile_lb=None, mobile_input=None):
+    """Build this frame's phone detector for the tracker, according to the configured mode."""
+    if MOBILE_HAND_CROPS:
+        return lambda f: detect_phones_in_hands(mobile_model, f, person_keypoints,
+                                                HAND_CROP_SIZE, HAND_CROP_IMGSZ)
+    if USE_TILED_INFERENCE:
+        return lambda f: tiled_phones(mobile_model, f, tiles)
+    if DECOUPLED_INFERENCE:
+        return lambda f: mobile_lb.boxes(detect_phones(
+            mobile_model, mobile_input if mobile_input is not None else mobile_lb.tensor(raw_frame)))
+    return lambda f: detect_phones(mobile_model, f)
+
+def track_phones(frame, gray, detect_fn):
+    """Per-frame phone boxes from the tracker; detector errors count as no phone."""
+    try:
+        return phone_tracker.update(frame, detect_fn, gray)
+    except Exception as e:
+        print("Mobile detection error:", e)
+        return []
+
+if CONCURRENT_INFERENCE:
+    # Pose runs on the main thread, the phone model on its own runner thread
+    torch.set_num_threads(POSE_THREADS)
+    mobile_runner = ModelRunner("mobile", MOBILE_THREADS)
+latency_stats = LatencyStats()
+# The finalizer inserts each detection itself, on its own connection, once the clip is stored
+clip_finalizer = ClipFinalizer(
+    MEDIA_DIR, connect_db,
+    scp=scp if IS_CLIENT else None,
+    ssh=ssh if IS_CLIENT else None,
+    remote_media_dir=REMOTE_MEDIA_DIR,
+)
+preview = PreviewPublisher(PREVIEW_PORT) if PREVIEW_PORT else None
 
 # ========================
 # VIDEO CAPTURE SETUP
@@ -118,6 +193,9 @@ else:
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
 
+# Tile layout is fixed for the session since every frame is resized to the same size
+tiles = make_tiles((FRAME_HEIGHT, FRAME_WIDTH), TILE_GRID, TILE_OVERLAP) if USE_TILED_INFERENCE else None
+
 # ========================
 # STATE VARIABLES
 # ========================
@@ -136,13 +214,32 @@ mobile_recording = False
 # ========================
 # MAIN LOOP
 # ========================
+prev_person_keypoints = []
 
 try:
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
-        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        frame_start = time.perf_counter()
+        if DECOUPLED_INFERENCE and not USE_TILED_INFERENCE:
+            # Letterbox the raw capture straight to the model input size, before any overlays
+            pose_lb = get_letterbox(frame.shape, POSE_IMGSZ, (FRAME_WIDTH, FRAME_HEIGHT))
+            pose_input = pose_lb.tensor(frame)
+            if MOBILE_IMGSZ == POSE_IMGSZ:
+                mobile_lb, mobile_input = pose_lb, pose_input
+            else:
+                # Built lazily, only on frames where the phone detector actually runs
+                mobile_lb = get_letterbox(frame.shape, MOBILE_IMGSZ, (FRAME_WIDTH, FRAME_HEIGHT))
+                mobile_input = None
+            raw_frame = frame
+            # The recording frame is only resized if the camera ignored the requested size
+            if frame.shape[:2] != (FRAME_HEIGHT, FRAME_WIDTH):
+                frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        else:
+            frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        # Clean grayscale copy for the phone tracker, taken before any overlays are drawn
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
         # ------------------------
         # Overlay Date/Time & Lecture Hall Info
@@ -158,23 +255,48 @@ try:
         # ------------------------
         # Turning Back Detection with Pose Model
         # ------------------------
-        pose_results = pose_model(frame)
+        if CONCURRENT_INFERENCE:
+            # Phones are detected on the mobile runner while pose runs here. The hand
+            # crops use the previous frame's wrists since this frame's pose isn't ready.
+            decoupled = DECOUPLED_INFERENCE and not USE_TILED_INFERENCE
+            phone_future = mobile_runner.submit(
+                track_phones, frame, gray,
+                make_phone_detect_fn(prev_person_keypoints, raw_frame, mobile_lb, mobile_input)
+                if decoupled else make_phone_detect_fn(prev_person_keypoints))
+
+        if USE_TILED_INFERENCE:
+            person_keypoints = tiled_pose(pose_model, frame, tiles)
+        elif DECOUPLED_INFERENCE:
+            person_keypoints = []
+            for result in pose_model(pose_input):
+                if result.keypoints:
+                    person_keypoints.extend(pose_lb.points(result.keypoints.xy.cpu().numpy()))
+        else:
+            person_keypoints = []
+            for result in pose_model(frame):
+                if result.keypoints:
+                    person_keypoints.extend(result.keypoints.xy.cpu().numpy())
+
+        prev_person_keypoints = person_keypoints
+
+        if CONCURRENT_INFERENCE:
+            # Wait for the phone model before anything is drawn on the frame it reads
+            phone_boxes = phone_future.result()
+
         turning_this_frame = False
-        for result in pose_results:
-            keypoints_arr = result.keypoints.xy.cpu().numpy() if result.keypoints else []
-            for kp in keypoints_arr:
-                if is_turning_back(kp):
-                    turning_this_frame = True
-                    # Mark the first 6 keypoints in red for turning
-                    for x, y in kp[:6]:
-                        cv2.circle(frame, (int(x), int(y)), 5, (0, 0, 255), -1)
-                else:
-                    # Mark the first 6 keypoints in green if not turning
-                    for x, y in kp[:6]:
-                        cv2.circle(frame, (int(x), int(y)), 5, (0, 255, 0), -1)
-                # Mark remaining keypoints in green
-                for x, y in kp[6:]:
+        for kp in person_keypoints:
+            if is_turning_back(kp):
+                turning_this_frame = True
+                # Mark the first 6 keypoints in red for turning
+                for x, y in kp[:6]:
+                    cv2.circle(frame, (int(x), int(y)), 5, (0, 0, 255), -1)
+            else:
+                # Mark the first 6 keypoints in green if not turning
+                for x, y in kp[:6]:
                     cv2.circle(frame, (int(x), int(y)), 5, (0, 255, 0), -1)
+            # Mark remaining keypoints in green
+            for x, y in kp[6:]:
+                cv2.circle(frame, (int(x), int(y)), 5, (0, 255, 0), -1)
 
         # Update state for turning detection
         if turning_this_frame:
@@ -196,8 +318,6 @@ try:
                     if turning_recording and turning_video:
                         turning_video.release()
                     now_save = datetime.now()
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
-                    proof_filename = f"output_turningback_{timestamp}.mp4"
                     date_db = now_save.date().isoformat()
                     time_db = now_save.time().strftime('%H:%M:%S')
                     cursor.execute(
@@ -207,18 +327,8 @@ try:
                     hall_result = cursor.fetchone()
                     hall_id = hall_result[0] if hall_result else None
                     local_temp = "output_turningback.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./DetectSus/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    values = (date_db, time_db, TURNING_BACK_ACTION, proof_filename, hall_id)
-                    cursor.execute(sql, values)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, TURNING_BACK_ACTION, hall_id)
                 else:
                     if turning_recording and turning_video:
                         turning_video.release()
@@ -234,22 +344,20 @@ try:
         # ------------------------
         # Mobile Phone Detection with Mobile Model
         # ------------------------
-        try:
-            mobile_results = mobile_model(frame)
-        except Exception as e:
-            print("Mobile detection error:", e)
-            mobile_results = []
-
-        mobile_detected = False
-        for result in mobile_results:
-            if result.boxes is not None:
-                for box in result.boxes:
-                    if int(box.cls) == 67:  # Class 67 represents mobile phone
-                        mobile_detected = True
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        # Draw an orange rectangle and label
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 165, 255), 2)
-                        cv2.putText(frame, "Mobile", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+        # The full detector only runs every MOBILE_DETECT_EVERY frames (or early when
+        # tracking is lost); the tracker still yields a per-frame set of phone boxes.
+        if not CONCURRENT_INFERENCE:
+            if DECOUPLED_INFERENCE and not USE_TILED_INFERENCE:
+                detect_fn = make_phone_detect_fn(person_keypoints, raw_frame, mobile_lb, mobile_input)
+            else:
+                detect_fn = make_phone_detect_fn(person_keypoints)
+            phone_boxes = track_phones(frame, gray, detect_fn)
+
+        mobile_detected = len(phone_boxes) > 0
+        for x1, y1, x2, y2 in phone_boxes:
+            # Draw an orange rectangle and label
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 165, 255), 2)
+            cv2.putText(frame, "Mobile", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
 
         # Update state for mobile detection
         if mobile_detected:
@@ -272,8 +380,6 @@ try:
                     if mobile_recording and mobile_video:
                         mobile_video.release()
                     now_save = datetime.now()
-                    timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
-                    proof_filename = f"output_mobiledetection_{timestamp}.mp4"
                     date_db = now_save.date().isoformat()
                     time_db = now_save.time().strftime('%H:%M:%S')
                     cursor.execute(
@@ -283,18 +389,8 @@ try:
                     hall_result = cursor.fetchone()
                     hall_id = hall_result[0] if hall_result else None
                     local_temp = "output_mobiledetection.mp4"
-                    dest_path = os.path.join(MEDIA_DIR, proof_filename)
-                    shutil.copy(local_temp, dest_path)
-                    if IS_CLIENT:
-                        remote_dest = f"./AIInvigilator/media/{proof_filename}"
-                        scp.put(local_temp, remote_dest)
-                    sql = """
-                        INSERT INTO app_malpraticedetection (date, time, malpractice, proof, lecture_hall_id)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    values = (date_db, time_db, ACTION_NAME, proof_filename, hall_id)
-                    cursor.execute(sql, values)
-                    db.commit()
+                    # Transcoded, stored under its content hash and recorded off the loop thread
+                    clip_finalizer.finalize(local_temp, latency_stats.fps(), date_db, time_db, ACTION_NAME, hall_id)
                 else:
                     if mobile_recording and mobile_video:
                         mobile_video.release()
@@ -304,12 +400,17 @@ try:
                 mobile_recording = False
                 mobile_video = None
 
+        latency_stats.add(frame_start)
+
         # ------------------------
         # Display and Key Check
         # ------------------------
-        cv2.imshow("Exam Monitoring - Merged", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+        if preview:
+            preview.submit(frame)
+        if not HEADLESS:
+            cv2.imshow("Exam Monitoring - Merged", frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
 
 except KeyboardInterrupt:
     print("Received keybaord interrupt; shutting down...")
@@ -317,10 +418,15 @@ except KeyboardInterrupt:
 finally:
     # Cleanup
     cap.release()
+    if CONCURRENT_INFERENCE:
+        mobile_runner.shutdown()
+    if preview:
+        preview.close()
     if turning_recording and turning_video:
         turning_video.release()
     if mobile_recording and mobile_video:
         mobile_video.release()
+    clip_finalizer.shutdown()
     if IS_CLIENT:
         scp.close()
         ssh.close()
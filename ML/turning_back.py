@@ -183,7 +183,8 @@ while cap.isOpened():
             hall_result = cursor.fetchone()
             hall_id = hall_result[0] if hall_result else None
 
-            timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S")
+            # Microseconds keep two clips from the same second apart (proof is unique)
+            timestamp = now_save.strftime("%Y-%m-%d_%H-%M-%S-%f")
             proof_filename = f"output_{timestamp}.mp4"
 
             # Copy local temp file to final name in host media dir
@@ -202,8 +203,12 @@ while cap.isOpened():
                 VALUES (%s, %s, %s, %s, %s)
             """
             values = (date_db, time_db, ACTION_NAME, proof_filename, hall_id)
-            cursor.execute(sql, values)
-            db.commit()
+            try:
+                cursor.execute(sql, values)
+                db.commit()
+            except mysql.connector.IntegrityError as e:
+                # Keep capturing; the unreferenced clip is left for the orphan scan
+                print(f"[ERROR] Could not log detection {proof_filename}: {e}")
 
             malpractice = 0
             video_control = 0
@@ -0,0 +1,11 @@
+# apps.py
+from django.apps import AppConfig
+
+
+class MainAppConfig(AppConfig):
+    name = 'app'
+
+    def ready(self):
+        # The summary table has to see every ORM delete, including those made by
+        # management commands, which never import the views
+        from . import cache, summary  # noqa: F401
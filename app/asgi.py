@@ -2,15 +2,242 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is what production runs (``uvicorn app.asgi:application``, see start.sh).
+
+Besides Django itself, it serves two long-lived streams without tying up
+a Django thread per viewer:
+
+- ``/events/stream/``: a Server-Sent Events stream of new, reviewed and
+  deleted detections for the malpractice log.
+- ``/camera_preview/<index>/``: a relay of a camera worker's MJPEG preview,
+  so the workers' preview ports never need to be reachable from outside.
+
+Django 3.2's own ASGI handler runs every sync view on one shared thread and
+iterates streaming responses (exports, media ranges) on the event loop, so
+the site is served as WSGI on a thread pool instead; only the long-lived
+streams here are async.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
 
-from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+wsgi_application = get_wsgi_application()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from asgiref.wsgi import WsgiToAsgiInstance  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user  # noqa: E402
+from importlib import import_module  # noqa: E402
+
+from .events import HEARTBEAT, Subscriber, broker, user_hall_ids  # noqa: E402
+
+EVENTS_PATH = '/events/stream/'
+PREVIEW_PATH = re.compile(r'^/camera_preview/(\d+)/$')
+PREVIEW_TIMEOUT = 5  # seconds to reach a camera worker's preview server
+HALL_REFRESH = 60  # seconds between re-reading a teacher's halls on an open stream
+DJANGO_THREADS = int(os.environ.get('DJANGO_THREADS', '8'))  # concurrent Django requests
+
+_django_pool = ThreadPoolExecutor(max_workers=DJANGO_THREADS, thread_name_prefix='django')
+
+
+class DjangoRequest(WsgiToAsgiInstance):
+    """
+    One request to the WSGI app, run on _django_pool. Unlike asgiref's
+    default it runs requests in parallel and closes the response, which is
+    what fires Django's request_finished (and closes the DB connection).
+    """
+
+    def start_response(self, status, response_headers, exc_info=None):
+        # Django's WSGI handler leaves a leading space on Set-Cookie values, which h11 rejects
+        return super().start_response(status, [(name, value.strip()) for name, value in response_headers],
+                                      exc_info)
+
+    @sync_to_async(thread_sensitive=False, executor=_django_pool)
+    def run_wsgi_app(self, body):
+        response = wsgi_application(self.build_environ(self.scope, body), self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if output:
+                    self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+
+
+async def django_application(scope, receive, send):
+    if scope['type'] != 'http':
+        return  # no websockets; lifespan events need no setup
+    await DjangoRequest(wsgi_application)(scope, receive, send)
+
+
+# Stream handlers' DB lookups. Not thread_sensitive: the next request on a
+# keep-alive connection inherits the previous one's context, and with it an
+# asgiref thread executor that has already shut down.
+in_django_thread = sync_to_async(thread_sensitive=False, executor=_django_pool)
+
+
+@in_django_thread
+def authenticate(scope):
+    """Resolve the session cookie to a user and their halls, once per connection."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None, []
+    store = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user = get_user(SimpleNamespace(session=store))
+    if not user.is_authenticated:
+        return None, []
+    return user, ([] if user.is_superuser else user_hall_ids(user))
+
+
+async def plain_response(send, status, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def events_stream(scope, receive, send):
+    user, hall_ids = await authenticate(scope)
+    if user is None:
+        await plain_response(send, 403, b'Login required')
+        return
+
+    subscriber = Subscriber(user, hall_ids, asyncio.get_running_loop())
+    broker.subscribe(subscriber)
+    loop = asyncio.get_running_loop()
+    halls_read_at = loop.time()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),  # stop nginx from buffering the stream
+    ]})
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        next_message = asyncio.ensure_future(subscriber.queue.get())
+        while True:
+            await asyncio.wait({next_message, disconnected}, timeout=HEARTBEAT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                break
+            if not subscriber.is_admin and loop.time() - halls_read_at > HALL_REFRESH:
+                # Halls are reassigned while dashboards stay open
+                subscriber.hall_ids = set(await in_django_thread(user_hall_ids)(user))
+                halls_read_at = loop.time()
+            if next_message.done():
+                message = next_message.result()
+                next_message = asyncio.ensure_future(subscriber.queue.get())
+            else:
+                message = ': ping\n\n'
+            await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+        next_message.cancel()
+    except OSError:
+        pass
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscriber)
+
+
+async def open_preview(host, port):
+    """Connect to a camera worker's preview server; returns (reader, writer, content type)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), PREVIEW_TIMEOUT)
+    try:
+        writer.write(f'GET /stream.mjpg HTTP/1.0\r\nHost: {host}:{port}\r\n\r\n'.encode())
+        status = await asyncio.wait_for(reader.readline(), PREVIEW_TIMEOUT)
+        if status.split()[1:2] != [b'200']:
+            raise OSError(f'preview server answered {status.decode("latin-1").strip()!r}')
+        content_type = b'multipart/x-mixed-replace'
+        while True:
+            line = await asyncio.wait_for(reader.readline(), PREVIEW_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-type':
+                content_type = value.strip()
+    except BaseException:
+        writer.close()
+        raise
+    return reader, writer, content_type
+
+
+async def camera_preview(scope, receive, send, index):
+    user, _ = await authenticate(scope)
+    if user is None or not user.is_superuser:
+        await plain_response(send, 403, b'Admin login required')
+        return
+    try:
+        config = settings.CAMERA_CONFIGS[index]
+        port = config['preview_port']
+    except (IndexError, KeyError):
+        await plain_response(send, 404, b'No preview for this camera')
+        return
+
+    host = config.get('ip', '127.0.0.1') if config.get('mode') == 'remote' else '127.0.0.1'
+    try:
+        reader, writer, content_type = await open_preview(host, port)
+    except (OSError, asyncio.TimeoutError) as e:
+        await plain_response(send, 502, f'Preview unavailable: {e}'.encode())
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', content_type),
+        (b'cache-control', b'no-cache, private'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            chunk = asyncio.ensure_future(reader.read(64 * 1024))
+            await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                chunk.cancel()
+                return
+            if not chunk.result():
+                break  # the camera worker stopped
+            await send({'type': 'http.response.body', 'body': chunk.result(), 'more_body': True})
+        await send({'type': 'http.response.body'})
+    except OSError:
+        pass
+    finally:
+        disconnected.cancel()
+        writer.close()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        if scope['path'] == EVENTS_PATH:
+            await events_stream(scope, receive, send)
+            return
+        preview = PREVIEW_PATH.match(scope['path'])
+        if preview:
+            await camera_preview(scope, receive, send, int(preview.group(1)))
+            return
+    await django_application(scope, receive, send)
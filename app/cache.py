@@ -0,0 +1,118 @@
+# cache.py
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import LectureHall, MalpraticeDetection, TeacherProfile
+
+# Each group of entries is keyed under a version number; bumping the version
+# drops the whole group at once without having to know which keys exist.
+DIRECTORY = "directory"    # buildings, faculty and teacher lists
+DETECTIONS = "detections"  # per-user counts, newest detection id
+
+
+def _version_key(group):
+    return f"page_cache:{group}:version"
+
+
+def _version(group):
+    # A start value from the clock, so a version evicted from the cache never
+    # comes back as a number that still has entries stored under it
+    return cache.get_or_set(_version_key(group), time.time_ns(), None)
+
+
+def bump(*groups):
+    """Invalidate every entry in `groups`."""
+    for group in groups:
+        try:
+            cache.incr(_version_key(group))
+        except ValueError:
+            cache.set(_version_key(group), time.time_ns(), None)
+
+
+def cached(group, name, compute):
+    """
+    `compute()`, stored for PAGE_CACHE_TTL seconds under the current version
+    of `group`. The TTL also bounds how stale an entry can get from changes
+    no signal reports, such as the camera scripts' raw SQL inserts.
+    """
+    key = f"page_cache:{group}:{_version(group)}:{name}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.PAGE_CACHE_TTL)
+    return value
+
+
+def buildings():
+    return cached(DIRECTORY, "buildings", lambda: list(
+        LectureHall.objects.order_by('building').values_list('building', flat=True).distinct()))
+
+
+def faculty_list():
+    return cached(DIRECTORY, "faculty", lambda: list(
+        User.objects.filter(teacherprofile__isnull=False, is_superuser=False)
+        .only('id', 'username', 'first_name', 'last_name')))
+
+
+def teachers():
+    return cached(DIRECTORY, "teachers", lambda: list(
+        User.objects.filter(is_superuser=False).only('id', 'username', 'first_name', 'last_name')))
+
+
+def log_counts(user, logs):
+    """
+    {'total', 'pending', 'reviewed'} over `logs`, the detections `user` can
+    see. Admins all see the same rows, so they share one entry.
+    """
+    name = "counts:admin" if user.is_superuser else f"counts:{user.id}"
+    return cached(DETECTIONS, name, lambda: logs.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(verified=False)),
+        reviewed=Count('id', filter=Q(verified=True)),
+    ))
+
+
+def latest_detection_id():
+    return cached(DETECTIONS, "latest_id", lambda: (
+        MalpraticeDetection.objects.aggregate(latest=Max('id'))['latest'] or 0))
+
+
+def saw_detection(latest_id):
+    """
+    Report the newest detection id seen elsewhere (the new_detections poll).
+    Camera inserts send no signal, so this is how counts notice them before
+    the TTL runs out.
+    """
+    cached_id = cache.get(f"page_cache:{DETECTIONS}:{_version(DETECTIONS)}:latest_id")
+    if cached_id is not None and latest_id > cached_id:
+        bump(DETECTIONS)
+
+
+@receiver([post_save, post_delete], sender=LectureHall)
+def hall_changed(sender, **kwargs):
+    # Teachers see detections through their hall, so counts move with it
+    bump(DIRECTORY, DETECTIONS)
+
+
+@receiver([post_save, post_delete], sender=TeacherProfile)
+def teacher_changed(sender, **kwargs):
+    bump(DIRECTORY)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    # Every login saves last_login; that changes nothing shown here
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump(DIRECTORY)
+
+
+@receiver([post_save, post_delete], sender=MalpraticeDetection)
+def detection_changed(sender, **kwargs):
+    bump(DETECTIONS)
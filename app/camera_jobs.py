@@ -0,0 +1,142 @@
+# camera_jobs.py
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .supervisor import supervisor
+from .utils import RUNNING_SCRIPTS, ssh_run_script, ssh_stop_script
+
+SSH_TIMEOUT = 10      # seconds per host for connect / open / stop
+MAX_HOSTS = 16        # remote hosts contacted at once
+MAX_JOBS = 50         # finished jobs kept for the status endpoint
+
+_executor = ThreadPoolExecutor(max_workers=MAX_HOSTS, thread_name_prefix="camera-ssh")
+JOBS = {}
+_jobs_lock = threading.Lock()
+
+
+def _new_job(action, names):
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "action": action,
+        "created": time.time(),
+        "done": False,
+        "hosts": {name: {"state": "pending", "message": "", "elapsed": None} for name in names},
+        "started": {},  # host -> time.monotonic() when its task got a worker
+    }
+    with _jobs_lock:
+        JOBS[job_id] = job
+        # Drop the oldest jobs once the registry is full
+        for old_id in sorted(JOBS, key=lambda k: JOBS[k]["created"])[:-MAX_JOBS]:
+            JOBS.pop(old_id, None)
+    return job
+
+
+def _run_host(job, name, fn):
+    host = job["hosts"][name]
+    start = time.monotonic()
+    with _jobs_lock:
+        host["state"] = "running"
+        job["started"][name] = start
+    try:
+        success, message = fn()
+        state = "ok" if success else "error"
+    except Exception as e:
+        state, message = "error", str(e)
+    with _jobs_lock:
+        if host["state"] == "timeout":
+            # Already reported; a late answer must not change a finished job
+            print(f"[{name}]: finished after the job timed out ({state}: {message})")
+            return
+        host.update(state=state, message=message, elapsed=round(time.monotonic() - start, 2))
+    print(f"[{name}]: {message if state == 'ok' else 'Error: ' + message}")
+
+
+def _fan_out(job, tasks):
+    """
+    Run one task per host on the shared pool and mark hosts that overrun the
+    timeout. Each host's time counts from when its task starts, so hosts
+    queued behind busy workers (a big job, or several jobs) are not charged
+    for the wait.
+    """
+    limit = SSH_TIMEOUT * 2
+    futures = {_executor.submit(_run_host, job, name, fn): name for name, fn in tasks}
+    pending = set(futures)
+    while pending:
+        with _jobs_lock:
+            starts = [job["started"][futures[f]] for f in pending if futures[f] in job["started"]]
+        # Wake for the next finished host, or when the earliest running one overruns
+        deadline = (min(starts) if starts else time.monotonic()) + limit
+        _, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        with _jobs_lock:
+            for future in list(pending):
+                name = futures[future]
+                if name in job["started"] and now - job["started"][name] >= limit:
+                    pending.discard(future)
+                    job["hosts"][name].update(state="timeout", message=f"No response after {limit}s")
+    with _jobs_lock:
+        job["done"] = True
+
+
+def _start_local(configs):
+    supervisor.start(configs)
+    return True, f"{len(configs)} local camera(s) started."
+
+
+def _stop_local():
+    supervisor.stop_all()
+    return True, "Local cameras stopped."
+
+
+def start_cameras(configs):
+    """
+    Start every camera config without blocking the request: local configs go
+    to the supervisor, remote ones are started in parallel over pooled SSH
+    connections. Returns the job id to poll with `job_status`.
+    """
+    local_configs = [c for c in configs if c.get("mode") == "local"]
+    remote_configs = [c for c in configs if c.get("mode") == "remote"]
+
+    tasks = []
+    if local_configs:
+        tasks.append(("local", lambda: _start_local(local_configs)))
+    for config in remote_configs:
+        tasks.append((config["name"], lambda c=config: ssh_run_script(
+            c["ip"], c["username"], c["password"], c["script_path"],
+            c.get("use_venv", True), c.get("venv_path", None), timeout=SSH_TIMEOUT
+        )))
+
+    job = _new_job("start", [name for name, _ in tasks])
+    threading.Thread(target=_fan_out, args=(job, tasks), daemon=True).start()
+    return job["id"]
+
+
+def stop_cameras():
+    """Stop all remote scripts in parallel and the local workers; returns the job id."""
+    tasks = [(key, lambda k=key: ssh_stop_script(k, timeout=SSH_TIMEOUT))
+             for key, handle in list(RUNNING_SCRIPTS.items()) if handle.get("mode") == "remote"]
+    tasks.append(("local", _stop_local))
+
+    job = _new_job("stop", [name for name, _ in tasks])
+    threading.Thread(target=_fan_out, args=(job, tasks), daemon=True).start()
+    return job["id"]
+
+
+def job_status(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return None
+    hosts = job["hosts"]
+    summary = {}
+    for host in hosts.values():
+        summary[host["state"]] = summary.get(host["state"], 0) + 1
+    return {
+        "id": job["id"],
+        "action": job["action"],
+        "done": job["done"],
+        "summary": summary,
+        "hosts": [dict(name=name, **host) for name, host in hosts.items()],
+    }
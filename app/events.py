@@ -0,0 +1,151 @@
+# events.py
+import asyncio
+import json
+import threading
+import time
+
+from django.db import close_old_connections
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+
+from .models import LectureHall, MalpraticeDetection
+
+POLL_INTERVAL = 2       # seconds between checks for rows inserted by the camera scripts
+QUEUE_SIZE = 100        # events buffered per connection before a slow client starts losing them
+HEARTBEAT = 15          # seconds between keep-alive comments on idle streams
+
+
+class Subscriber:
+    """One open dashboard. Holds what is needed to filter events without touching the DB."""
+
+    def __init__(self, user, hall_ids, loop):
+        self.user_id = user.id
+        self.is_admin = user.is_superuser
+        self.hall_ids = set(hall_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def wants(self, event):
+        if self.is_admin:
+            return True
+        # Teachers only see approved detections in their own halls, as in malpractice_log
+        if event["hall_id"] not in self.hall_ids:
+            return False
+        return event["type"] == "deleted" or (event["verified"] and event["is_malpractice"])
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+class EventBroker:
+    """
+    In-process fan-out of detection events to Server-Sent Event streams.
+
+    Each event is rendered once (an admin and a teacher version of the table
+    row) and handed to every matching subscriber's queue, so one detection
+    reaches any number of open dashboards without a query per client.
+
+    The camera scripts insert rows with raw SQL, so no signal fires for new
+    detections; while anyone is subscribed, a single watcher thread per
+    process checks MAX(id) and publishes rows above its watermark. Reviews
+    and deletes made through the ORM arrive through signals.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.watcher = None
+        self.last_id = None
+
+    def subscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if self.watcher is None or not self.watcher.is_alive():
+                self.watcher = threading.Thread(target=self._watch, daemon=True)
+                self.watcher.start()
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event):
+        message = f"event: detection\ndata: {json.dumps(event)}\n\n"
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            if subscriber.wants(event):
+                # Queues belong to the event loop; hand the message over thread-safely
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+
+    def _watch(self):
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    # Start from the current MAX(id) again next time instead of replaying the gap
+                    self.watcher = None
+                    self.last_id = None
+                    return
+            try:
+                close_old_connections()
+                latest = MalpraticeDetection.objects.aggregate(latest=Max("id"))["latest"] or 0
+                if self.last_id is None:
+                    self.last_id = latest
+                elif latest > self.last_id:
+                    new_logs = (MalpraticeDetection.objects
+                                .filter(id__gt=self.last_id, id__lte=latest)
+                                .select_related("lecture_hall__assigned_teacher")
+                                .order_by("id"))
+                    for log in new_logs:
+                        self.publish(detection_event(log, "new"))
+                    self.last_id = latest
+            except Exception as e:
+                print(f"[WARN] Detection event watcher error: {e}")
+            time.sleep(POLL_INTERVAL)
+
+
+broker = EventBroker()
+
+
+def detection_event(log, event_type):
+    """Event payload with the row pre-rendered for admins and teachers."""
+    event = {
+        "type": event_type,
+        "id": log.id,
+        "hall_id": log.lecture_hall_id,
+        "verified": log.verified,
+        "is_malpractice": log.is_malpractice,
+        "date": log.date.isoformat() if log.date else "",
+        "time": log.time.isoformat() if log.time else "",
+        "malpractice": log.malpractice,
+    }
+    if event_type != "deleted":
+        # Deleted rows are only matched by id and hall; skipping the hall lookup
+        # keeps bulk deletes from costing a query per row
+        event["building"] = log.lecture_hall.building if log.lecture_hall else ""
+        for key, is_admin in (("admin_html", True), ("teacher_html", False)):
+            event[key] = render_to_string("malpractice_log_rows.html", {
+                "result": [log], "row_offset": 0, "is_admin": is_admin,
+            })
+    return event
+
+
+@receiver(post_save, sender=MalpraticeDetection)
+def publish_review(sender, instance, created, **kwargs):
+    # New rows are picked up by the watcher, which also sees raw inserts
+    if not created and broker.subscribers:
+        broker.publish(detection_event(instance, "reviewed"))
+
+
+@receiver(post_delete, sender=MalpraticeDetection)
+def publish_delete(sender, instance, **kwargs):
+    if broker.subscribers:
+        broker.publish(detection_event(instance, "deleted"))
+
+
+def user_hall_ids(user):
+    return list(LectureHall.objects.filter(assigned_teacher=user).values_list("id", flat=True))
@@ -0,0 +1,163 @@
+# exports.py
+import csv
+import io
+
+from django.db.models import Q
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+EXPORT_CHUNK = 2000  # rows per keyset page / CSV write / Parquet row group
+
+# (column, lookup); the first three drive the keyset paging below
+EXPORT_FIELDS = [
+    ("id", "id"),
+    ("date", "date"),
+    ("time", "time"),
+    ("malpractice", "malpractice"),
+    ("building", "lecture_hall__building"),
+    ("lecture_hall", "lecture_hall__hall_name"),
+    ("faculty", "lecture_hall__assigned_teacher__username"),
+    ("verified", "verified"),
+    ("is_malpractice", "is_malpractice"),
+    ("proof", "proof"),
+]
+
+
+def keyset_after(last_date, last_time, last_id):
+    """
+    Filter for the rows after (last_date, last_time, last_id) in
+    (-date, -time, -id) order. date and time are nullable, and MySQL (like
+    SQLite) sorts NULL last in descending order: rows without a date come
+    after all dated ones, and within a day rows without a time come last.
+    """
+    if last_time is None:
+        within = Q(time__isnull=True, id__lt=last_id)
+    else:
+        within = Q(time__lt=last_time) | Q(time=last_time, id__lt=last_id) | Q(time__isnull=True)
+    if last_date is None:
+        return Q(date__isnull=True) & within
+    return Q(date__lt=last_date) | Q(date__isnull=True) | (Q(date=last_date) & within)
+
+
+def export_rows(logs, chunk_size=EXPORT_CHUNK):
+    """
+    Yield EXPORT_FIELDS tuples for `logs`, which must be ordered by
+    (-date, -time, -id), one keyset page of `chunk_size` rows at a time.
+
+    `.iterator()` alone is not enough on MySQL: the driver still buffers the
+    whole result, so each query is bounded to one page and the next page
+    starts after the last row seen. Memory stays flat for any row count.
+    """
+    lookups = [lookup for column, lookup in EXPORT_FIELDS]
+    page = logs
+    while True:
+        count = 0
+        last = None
+        for row in page.values_list(*lookups)[:chunk_size].iterator(chunk_size=chunk_size):
+            count += 1
+            last = row
+            yield row
+        if count < chunk_size:
+            return
+        last_id, last_date, last_time = last[:3]
+        page = logs.filter(keyset_after(last_date, last_time, last_id))
+
+
+def csv_chunks(rows, batch_size=EXPORT_CHUNK):
+    """CSV text for `rows`, header first, in pieces of `batch_size` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, lookup in EXPORT_FIELDS])
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever has been written since the last drain()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("time", pa.time64("us")),
+        ("malpractice", pa.string()),
+        ("building", pa.string()),
+        ("lecture_hall", pa.string()),
+        ("faculty", pa.string()),
+        ("verified", pa.bool_()),
+        ("is_malpractice", pa.bool_()),
+        ("proof", pa.string()),
+    ])
+
+
+def parquet_chunks(rows, batch_size=EXPORT_CHUNK):
+    """
+    Parquet bytes for `rows`, one row group per `batch_size` rows, yielded
+    as each row group is written so the file never sits in memory whole.
+    Needs pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                writer.write_table(_table(batch, schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            writer.write_table(_table(batch, schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _table(batch, schema):
+    columns = zip(*batch)
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+EXPORT_FORMATS = {
+    # format: (chunk generator, content type, extension)
+    "csv": (csv_chunks, "text/csv", "csv"),
+    "parquet": (parquet_chunks, "application/vnd.apache.parquet", "parquet"),
+}
+
+
+def parquet_available():
+    return pa is not None
@@ -0,0 +1,40 @@
+# file_cleaner.py
+import os
+import queue
+import threading
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run():
+    while True:
+        path = _queue.get()
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"[WARN] Could not delete file {path}: {e}")
+        finally:
+            _queue.task_done()
+
+
+def remove_files(paths):
+    """
+    Delete files on a background thread, so requests that drop many
+    detections return once the rows are gone instead of waiting on the disk.
+    A file that is already missing is ignored.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="file-cleaner", daemon=True)
+            _worker.start()
+    for path in paths:
+        _queue.put(path)
+
+
+def wait():
+    """Block until every queued file has been handled (management commands, shutdown)."""
+    _queue.join()
@@ -0,0 +1,46 @@
+# apply_media_retention.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.retention import FFMPEG, apply_policy, missing_clips, scan_orphans
+
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class Command(BaseCommand):
+    help = ("Apply MEDIA_RETENTION_POLICIES to proof clips (delete / archive / transcode) "
+            "and reconcile MEDIA_ROOT against the detection table.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="report what would change, touch nothing")
+        parser.add_argument("--limit", type=int, help="at most this many clips per policy")
+        parser.add_argument("--skip-policies", action="store_true", help="only run the orphan scan")
+        parser.add_argument("--orphans", choices=["skip", "report", "archive", "delete"], default="report",
+                            help="what to do with files that no detection points at (default: report)")
+        parser.add_argument("--missing", action="store_true", help="also list detections whose clip is gone")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        if not options["skip_policies"]:
+            for policy in settings.MEDIA_RETENTION_POLICIES:
+                if policy["action"] == "transcode" and not FFMPEG:
+                    self.stderr.write("[WARN] ffmpeg not found; skipping transcode policy.")
+                    continue
+                changed, freed = apply_policy(policy, dry_run=dry_run, limit=options["limit"])
+                verb = "would" if dry_run else "did"
+                self.stdout.write(f"{policy['state']} older than {policy['days']} days, {policy['action']}: "
+                                  f"{changed} clip(s), {verb} free {megabytes(freed)}")
+
+        if options["orphans"] != "skip":
+            action = "report" if dry_run else options["orphans"]
+            count, size = scan_orphans(action)
+            self.stdout.write(f"Orphaned files ({action}): {count}, {megabytes(size)}")
+
+        if options["missing"]:
+            missing = 0
+            for log_id, proof in missing_clips():
+                missing += 1
+                self.stdout.write(f"[MISSING] detection {log_id}: {proof}")
+            self.stdout.write(f"Detections with a missing clip: {missing}")
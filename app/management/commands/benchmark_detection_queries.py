@@ -0,0 +1,104 @@
+# benchmark_detection_queries.py
+import random
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+
+from app.models import LectureHall, MalpraticeDetection
+
+SEED_PREFIX = "seed/"
+ACTIONS = ["Leaning", "Passing Paper", "Mobile Phone Detected", "Turning Back", "Hand Raised"]
+
+
+class Command(BaseCommand):
+    help = ("Seed synthetic detections and print EXPLAIN plans and timings for the "
+            "malpractice_log / review_malpractice queries.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="insert this many synthetic rows first (e.g. 1000000)")
+        parser.add_argument("--clear", action="store_true", help="delete previously seeded rows and exit")
+        parser.add_argument("--runs", type=int, default=5, help="timed runs per query")
+        parser.add_argument("--batch", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted, _ = MalpraticeDetection.objects.filter(proof__startswith=SEED_PREFIX).delete()
+            LectureHall.objects.filter(hall_name__startswith="SEED").delete()
+            self.stdout.write(f"Deleted {deleted} seeded rows.")
+            return
+        if options["seed"]:
+            self.seed(options["seed"], options["batch"])
+            self.analyze()
+        self.benchmark(options["runs"])
+
+    def seed(self, count, batch):
+        halls = list(LectureHall.objects.all())
+        if not halls:
+            halls = [LectureHall.objects.create(building="MAIN", hall_name=f"SEED{i}") for i in range(20)]
+        start_day = date.today() - timedelta(days=365)
+        start_id = MalpraticeDetection.objects.count()
+        self.stdout.write(f"Seeding {count} rows across {len(halls)} halls...")
+        for offset in range(0, count, batch):
+            rows = []
+            for n in range(offset, min(offset + batch, count)):
+                verified = random.random() < 0.8
+                rows.append(MalpraticeDetection(
+                    date=start_day + timedelta(days=random.randrange(365)),
+                    time=dtime(random.randrange(8, 17), random.randrange(60), random.randrange(60)),
+                    malpractice=random.choice(ACTIONS),
+                    proof=f"{SEED_PREFIX}{start_id + n}.mp4",
+                    is_malpractice=(random.random() < 0.5) if verified else None,
+                    verified=verified,
+                    lecture_hall=random.choice(halls),
+                ))
+            MalpraticeDetection.objects.bulk_create(rows)
+            self.stdout.write(f"  {min(offset + batch, count)}/{count}")
+
+    def analyze(self):
+        """Refresh planner statistics so EXPLAIN reflects the seeded distribution."""
+        table = MalpraticeDetection._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+            else:
+                cursor.execute(f"ANALYZE {table}")
+
+    def queries(self):
+        order = ("-date", "-time", "-id")
+        logs = MalpraticeDetection.objects.all()
+        hall = LectureHall.objects.first()
+        newest = logs.order_by(*order).first()
+        queries = [
+            ("admin, not reviewed", logs.filter(verified=False).order_by(*order)[:51]),
+            ("admin, reviewed", logs.filter(verified=True).order_by(*order)[:51]),
+            ("admin, type filter", logs.filter(verified=True, malpractice="Leaning").order_by(*order)[:51]),
+            ("admin, AN session", logs.filter(verified=True, time__gte="12:00:00").order_by(*order)[:51]),
+            ("teacher, own hall", logs.filter(lecture_hall=hall, verified=True,
+                                              is_malpractice=True).order_by(*order)[:51]),
+            ("by date", logs.filter(date=newest.date if newest else date.today()).order_by(*order)[:51]),
+        ]
+        if newest:
+            queries.append(("review lookup by proof", logs.filter(proof=newest.proof)))
+            queries.append(("keyset page after newest", logs.filter(date__lte=newest.date).exclude(
+                id=newest.id).order_by(*order)[:51]))
+        return queries
+
+    def benchmark(self, runs):
+        total = MalpraticeDetection.objects.count()
+        self.stdout.write(f"{total} detections, {connection.vendor} backend\n")
+        for name, queryset in self.queries():
+            timings = []
+            for _ in range(runs):
+                reset_queries()
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms"))
+            self.stdout.write(queryset.explain())
+            self.stdout.write("")
@@ -0,0 +1,74 @@
+# export_detections.py
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from app.exports import EXPORT_FORMATS, export_rows, parquet_available
+from app.models import MalpraticeDetection
+
+
+class Command(BaseCommand):
+    help = ("Write detection logs to a CSV or Parquet file, streaming in fixed-size pages "
+            "(e.g. a nightly dump of yesterday's detections).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="file to write, or - for stdout (CSV only)")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), help="default: from the file extension, else csv")
+        parser.add_argument("--start", help="first date (YYYY-MM-DD)")
+        parser.add_argument("--end", help="last date (YYYY-MM-DD)")
+        parser.add_argument("--yesterday", action="store_true", help="only yesterday's detections")
+        parser.add_argument("--review", choices=["all", "reviewed", "not_reviewed", "approved"], default="all")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        export_format = options["format"] or ("parquet" if output.endswith(".parquet") else "csv")
+        if export_format == "parquet" and (output == "-" or not parquet_available()):
+            raise CommandError("Parquet export needs pyarrow and an output file.")
+
+        logs = MalpraticeDetection.objects.all()
+        if options["yesterday"]:
+            day = timezone.localdate() - timedelta(days=1)
+            logs = logs.filter(date=day)
+        for option, lookup in (("start", "date__gte"), ("end", "date__lte")):
+            if options[option]:
+                day = parse_date(options[option])
+                if day is None:
+                    raise CommandError(f"--{option} must be YYYY-MM-DD")
+                logs = logs.filter(**{lookup: day})
+        if options["review"] == "reviewed":
+            logs = logs.filter(verified=True)
+        elif options["review"] == "not_reviewed":
+            logs = logs.filter(verified=False)
+        elif options["review"] == "approved":
+            logs = logs.filter(verified=True, is_malpractice=True)
+        logs = logs.order_by("-date", "-time", "-id")
+
+        chunks = EXPORT_FORMATS[export_format][0]
+        rows = 0
+
+        def counted(source):
+            nonlocal rows
+            for row in source:
+                rows += 1
+                yield row
+
+        if output == "-":
+            for chunk in chunks(counted(export_rows(logs))):
+                self.stdout.write(chunk, ending="")
+            return
+
+        # Write next to the target and rename, so a reader never sees half a dump
+        tmp_path = output + ".part"
+        mode, encoding = ("w", "utf-8") if export_format == "csv" else ("wb", None)
+        try:
+            with open(tmp_path, mode, encoding=encoding, newline="" if encoding else None) as f:
+                for chunk in chunks(counted(export_rows(logs))):
+                    f.write(chunk)
+            os.replace(tmp_path, output)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.stderr.write(f"Exported {rows} detection(s) to {output}.")
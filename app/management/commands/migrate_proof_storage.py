@@ -0,0 +1,27 @@
+# migrate_proof_storage.py
+from django.core.management.base import BaseCommand
+
+from app.proof_storage import migrate_proofs
+
+
+class Command(BaseCommand):
+    help = ("Move proof clips stored under flat names into the date/hall sharded, content-addressed "
+            "layout (proofs/YYYY/MM/DD/hall-<id>/<hh>/<sha256>.mp4). Resumable: re-run to continue.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="print the new names, touch nothing")
+        parser.add_argument("--limit", type=int, help="at most this many detections")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        moved = missing = 0
+        for log_id, old_proof, new_proof in migrate_proofs(dry_run=dry_run, limit=options["limit"]):
+            if new_proof is None:
+                missing += 1
+                self.stdout.write(f"[MISSING] detection {log_id}: {old_proof}")
+                continue
+            moved += 1
+            if dry_run or options["verbosity"] > 1:
+                self.stdout.write(f"{old_proof} -> {new_proof}")
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(f"{verb} {moved} clip(s); {missing} missing.")
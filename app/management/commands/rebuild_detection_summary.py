@@ -0,0 +1,20 @@
+# rebuild_detection_summary.py
+from django.core.management.base import BaseCommand
+
+from app.summary import rebuild_summary, sync_summary
+
+
+class Command(BaseCommand):
+    help = "Recount DailyDetectionSummary from scratch (or, with --sync, fold in only new detections)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync", action="store_true",
+                            help="only add detections inserted since the last sync, as the dashboard does")
+
+    def handle(self, *args, **options):
+        if options["sync"]:
+            folded = sync_summary()
+            self.stdout.write(f"Folded {folded} new detection(s) into the summary.")
+            return
+        rows = rebuild_summary()
+        self.stdout.write(f"Rebuilt the detection summary: {rows} row(s).")
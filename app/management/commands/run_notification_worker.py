@@ -0,0 +1,33 @@
+# run_notification_worker.py
+from django.core.management.base import BaseCommand
+
+from app.notifications import NotificationWorker
+
+
+class Command(BaseCommand):
+    help = "Send queued email/SMS notifications from NotificationOutbox, reusing connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="send what is due now and exit")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls when idle")
+
+    def handle(self, *args, **options):
+        worker = NotificationWorker(batch_size=options["batch_size"])
+        if options["once"]:
+            total = 0
+            try:
+                while True:
+                    sent = worker.run_once()
+                    if not sent:
+                        break
+                    total += sent
+            finally:
+                worker.close_mail()
+            self.stdout.write(f"Processed {total} notification(s).")
+            return
+        self.stdout.write("Notification worker started.")
+        try:
+            worker.run(interval=options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Notification worker stopped.")
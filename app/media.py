@@ -0,0 +1,142 @@
+# media.py
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 256 * 1024
+
+
+def safe_media_path(root, path):
+    """Resolve `path` under `root`, refusing anything that escapes it."""
+    root = os.path.realpath(root)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root or not os.path.isfile(full_path):
+        raise Http404("File not found")
+    return full_path
+
+
+def make_etag(stat):
+    # Size + mtime is enough to tell rewritten clips apart without hashing them
+    return f'"{stat.st_size:x}-{int(stat.st_mtime * 1000):x}"'
+
+
+def _not_modified(request, etag, mtime):
+    """Conditional GET: If-None-Match wins over If-Modified-Since."""
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _parse_range(header, size):
+    """Return (start, end) for a single `bytes=` range, None to send the whole file, or False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # multiple or malformed ranges: ignore and send the whole file
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return False
+        start, end = max(0, size - length), size - 1
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            return None  # invalid (not merely unsatisfiable): ignored, like a malformed header
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+class RangeFileWrapper:
+    """Iterate over `length` bytes of a file starting at `offset`."""
+
+    def __init__(self, filelike, offset, length):
+        self.filelike = filelike
+        self.filelike.seek(offset)
+        self.remaining = length
+
+    def __iter__(self):
+        try:
+            while self.remaining > 0:
+                data = self.filelike.read(min(CHUNK_SIZE, self.remaining))
+                if not data:
+                    break
+                self.remaining -= len(data)
+                yield data
+        finally:
+            self.filelike.close()
+
+    def close(self):
+        self.filelike.close()
+
+
+def serve_media(request, full_path, accel_mode=None, accel_prefix="", relative_path=""):
+    """
+    Serve a media file with byte ranges, ETag / Last-Modified validators and
+    conditional GET, so browsers can seek in a clip without re-downloading it.
+
+    With `accel_mode` set to "nginx" (X-Accel-Redirect) or "sendfile"
+    (X-Sendfile), only the headers are built here and the front proxy
+    streams the bytes and handles the ranges itself.
+    """
+    stat = os.stat(full_path)
+    etag = make_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        return response
+
+    if accel_mode:
+        response = HttpResponse(content_type=content_type)
+        if accel_mode == "nginx":
+            response["X-Accel-Redirect"] = quote(accel_prefix.rstrip("/") + "/" + relative_path.lstrip("/"))
+        else:
+            response["X-Sendfile"] = full_path
+    else:
+        size = stat.st_size
+        byte_range = None
+        range_header = request.META.get("HTTP_RANGE")
+        if_range = request.META.get("HTTP_IF_RANGE")
+        # If-Range: only honour the range while the client's copy is still current
+        if range_header and (not if_range or if_range.strip() in (etag, last_modified)):
+            byte_range = _parse_range(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(RangeFileWrapper(open(full_path, "rb"), start, length),
+                                             status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(length)
+        else:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+            response["Content-Length"] = str(size)
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    # Authenticated content: browsers may cache it, shared caches may not
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
@@ -0,0 +1,70 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:23
+
+import os
+import posixpath
+import shutil
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def link_or_copy(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest + ".part")
+        os.replace(dest + ".part", dest)
+
+
+def rename_duplicate_proofs(apps, schema_editor):
+    """
+    proof becomes unique, but old clip names only had second precision, so
+    rows sharing one can be separate detections. Keep them all: the oldest
+    row keeps the name, every other row gets `<stem>-<id><ext>`, linked (or
+    copied) to the same file.
+    """
+    MalpraticeDetection = apps.get_model('app', 'MalpraticeDetection')
+    duplicates = (MalpraticeDetection.objects.values('proof')
+                  .annotate(n=Count('id')).filter(n__gt=1).values_list('proof', flat=True))
+    for proof in duplicates:
+        source = os.path.join(settings.MEDIA_ROOT, proof)
+        stem, ext = posixpath.splitext(proof)
+        for row in MalpraticeDetection.objects.filter(proof=proof).order_by('id')[1:]:
+            new_proof = f"{stem}-{row.id}{ext}"
+            dest = os.path.join(settings.MEDIA_ROOT, new_proof)
+            if os.path.exists(source) and not os.path.exists(dest):
+                link_or_copy(source, dest)
+            MalpraticeDetection.objects.filter(id=row.id).update(proof=new_proof)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_alter_malpraticedetection_verified'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_proofs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='malpraticedetection',
+            name='proof',
+            field=models.CharField(max_length=150, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='malpraticedetection',
+            index=models.Index(fields=['date', 'time'], name='malpractice_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='malpraticedetection',
+            index=models.Index(fields=['verified', 'date', 'time'], name='malpractice_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='malpraticedetection',
+            index=models.Index(fields=['lecture_hall', 'verified', 'is_malpractice', 'date', 'time'], name='malpractice_hall_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='malpraticedetection',
+            index=models.Index(fields=['malpractice', 'date', 'time'], name='malpractice_type_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='summary',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_detection_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='malpraticedetection',
+            name='media_state',
+            field=models.CharField(blank=True, choices=[('compact', 'Transcoded to a low bitrate'), ('archived', 'Moved to the archive'), ('deleted', 'Clip deleted')], max_length=10, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_detection_media_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detectionsummarystate',
+            name='gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_detection_summary_gaps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lecturehall',
+            name='building',
+            field=models.CharField(choices=[('MAIN', 'Main Block'), ('KE', 'Second Block'), ('PG', 'Third Block')], max_length=50),
+        ),
+    ]
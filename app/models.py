@@ -1,5 +1,6 @@
 # models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib import admin
 
@@ -26,14 +27,97 @@ class MalpraticeDetection(models.Model):
     date = models.DateField(null=True)
     time = models.TimeField(null=True)
     malpractice = models.CharField(max_length=150)
-    proof = models.CharField(max_length=150)
+    proof = models.CharField(max_length=150, unique=True)
     is_malpractice = models.BooleanField(null=True)
     verified = models.BooleanField(default=False)
     lecture_hall = models.ForeignKey(LectureHall, on_delete=models.SET_NULL, null=True, blank=True)
+    # Set by the media retention engine; NULL (what the camera scripts' raw
+    # INSERT leaves) means the clip is in MEDIA_ROOT as recorded
+    MEDIA_STATE_CHOICES = [
+        ('compact', 'Transcoded to a low bitrate'),
+        ('archived', 'Moved to the archive'),
+        ('deleted', 'Clip deleted'),
+    ]
+    media_state = models.CharField(max_length=10, choices=MEDIA_STATE_CHOICES, null=True, blank=True)
+
+    class Meta:
+        # One index per malpractice_log access path, each ending in the (date, time) sort order
+        indexes = [
+            models.Index(fields=['date', 'time'], name='malpractice_date_time_idx'),
+            models.Index(fields=['verified', 'date', 'time'], name='malpractice_review_idx'),
+            models.Index(fields=['lecture_hall', 'verified', 'is_malpractice', 'date', 'time'],
+                         name='malpractice_hall_idx'),
+            models.Index(fields=['malpractice', 'date', 'time'], name='malpractice_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.malpractice} - {self.date} {self.time}"
 
 
+# Outgoing email / SMS, sent by the run_notification_worker command
+class NotificationOutbox(models.Model):
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)  # email address or E.164 phone number
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    summary = models.CharField(max_length=200, blank=True)  # one line for digest messages
+    detection = models.ForeignKey(MalpraticeDetection, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    leased_until = models.DateTimeField(null=True, blank=True)  # set while a worker is sending it
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+
+# Per day / hall / malpractice type counts for the analytics dashboard, kept
+# up to date by app.summary and rebuilt by the rebuild_detection_summary command
+class DailyDetectionSummary(models.Model):
+    date = models.DateField(null=True)
+    lecture_hall = models.ForeignKey(LectureHall, on_delete=models.SET_NULL, null=True, blank=True)
+    malpractice = models.CharField(max_length=150)
+    total = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)   # not reviewed yet
+    approved = models.PositiveIntegerField(default=0)  # reviewed as malpractice
+    rejected = models.PositiveIntegerField(default=0)  # reviewed as not malpractice
+
+    class Meta:
+        unique_together = ('date', 'lecture_hall', 'malpractice')
+
+    def __str__(self):
+        return f"{self.date} {self.lecture_hall} {self.malpractice}: {self.total}"
+
+
+# Single row: detections with id <= last_id are counted in DailyDetectionSummary,
+# except the ids in `gaps` (recent ids that had no committed row when counted)
+class DetectionSummaryState(models.Model):
+    last_id = models.BigIntegerField(default=0)
+    gaps = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def counts(self, log_id):
+        """Whether detection `log_id` is already included in the summary."""
+        return log_id <= self.last_id and log_id not in self.gaps
+
+
 # Teacher Profile Model
 class TeacherProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
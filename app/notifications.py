@@ -0,0 +1,268 @@
+# notifications.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import NotificationOutbox, TeacherProfile
+from .utils import twilio_client
+
+MAX_ATTEMPTS = 6
+RETRY_BASE = 30           # seconds; doubles after every failed attempt
+RETRY_MAX = 60 * 60
+LEASE = 5 * 60            # claimed rows are hidden from other workers (and digests) this long
+SMTP_IDLE_TIMEOUT = 60    # close the SMTP connection after this long without mail
+SMS_DIGEST_LINES = 5      # cases listed in an SMS digest before "+N more"
+
+
+class TwilioSMSBackend:
+    """Sends through Twilio with one client reused for the life of the process."""
+
+    def send(self, to_phone, body):
+        twilio_client().messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to_phone)
+
+
+class ConsoleSMSBackend:
+    """Prints messages instead of sending them, for development."""
+
+    def send(self, to_phone, body):
+        print(f"[SMS] to {to_phone}:\n{body}\n", flush=True)
+
+
+class LocmemSMSBackend:
+    """Keeps messages in `LocmemSMSBackend.outbox`, like Django's locmem email backend."""
+    outbox = []
+
+    def send(self, to_phone, body):
+        self.outbox.append((to_phone, body))
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
+
+
+def detection_messages(log):
+    """Email and SMS content for an approved detection, as (channel, recipient, subject, body)."""
+    teacher_user = log.lecture_hall.assigned_teacher
+    name = teacher_user.get_full_name() or teacher_user.username
+    hall = f"{log.lecture_hall.building} - {log.lecture_hall.hall_name}"
+    messages = []
+
+    if teacher_user.email:
+        messages.append(('email', teacher_user.email, 'Malpractice Alert: New Case Reviewed', (
+            f"Dear {name},\n\n"
+            f"A malpractice has been detected in your classroom and has been approved by the examination cell.\n\n"
+            f"Details:\n"
+            f"- 📅 Date: {log.date}\n"
+            f"- ⏰ Time: {log.time}\n"
+            f"- 🎯 Type: {log.malpractice}\n"
+            f"- 🏫 Lecture Hall: {hall}\n\n"
+            f"You can view the recorded video proof from your AIInvigilator portal.\n\n"
+            f"Best regards,\nAIInvigilator Team"
+        )))
+
+    try:
+        phone = teacher_user.teacherprofile.phone
+    except TeacherProfile.DoesNotExist:
+        print(f"[WARN] No profile found for user: {teacher_user.username}")
+        phone = None
+    if phone:
+        messages.append(('sms', f"+91{phone.strip()}", '', (
+            f"Dear {name},\n\n"
+            f"🔔 Malpractice Alert\n"
+            f"{log.date} | {log.time}\n"
+            f"{log.malpractice} detected in {log.lecture_hall.building}-{log.lecture_hall.hall_name}.\n"
+            f"\nCheck AIInvigilator for video proof."
+        )))
+    return messages
+
+
+def detection_summary(log):
+    return (f"{log.date} | {log.time} | {log.malpractice} | "
+            f"{log.lecture_hall.building}-{log.lecture_hall.hall_name}")
+
+
+def unleased(now):
+    return Q(leased_until__isnull=True) | Q(leased_until__lte=now)
+
+
+def enqueue_detection_notifications(log):
+    """
+    Queue the teacher's email and SMS for an approved detection; the worker sends them.
+
+    Approvals for the same recipient are coalesced: each one pushes the
+    recipient's pending messages back to now + NOTIFICATION_DIGEST_WINDOW,
+    but never past NOTIFICATION_DIGEST_MAX_DELAY after the oldest of them,
+    and the worker sends whatever is due together as one digest. Rows a
+    worker has already claimed are left alone.
+    """
+    if not (log.lecture_hall and log.lecture_hall.assigned_teacher):
+        return []
+    now = timezone.now()
+    window = timedelta(seconds=settings.NOTIFICATION_DIGEST_WINDOW)
+    max_delay = timedelta(seconds=settings.NOTIFICATION_DIGEST_MAX_DELAY)
+    summary = detection_summary(log)
+    rows = []
+    with transaction.atomic():
+        for channel, recipient, subject, body in detection_messages(log):
+            waiting = (NotificationOutbox.objects.select_for_update()
+                       .filter(unleased(now), channel=channel, recipient=recipient, status='pending', attempts=0))
+            oldest = waiting.order_by('created_at').values_list('created_at', flat=True).first()
+            due = min(now + window, (oldest or now) + max_delay)
+            waiting.update(next_attempt_at=due)
+            rows.append(NotificationOutbox(channel=channel, recipient=recipient, subject=subject, body=body,
+                                           summary=summary, detection=log, next_attempt_at=due))
+        return NotificationOutbox.objects.bulk_create(rows)
+
+
+def digest_message(channel, rows):
+    """
+    One message covering several queued notifications for the same recipient,
+    built from the same wording as detection_messages(). Returns (subject, body).
+    """
+    if len(rows) == 1:
+        return rows[0].subject, rows[0].body
+    teacher_user = next((row.detection.lecture_hall.assigned_teacher for row in rows
+                         if row.detection and row.detection.lecture_hall
+                         and row.detection.lecture_hall.assigned_teacher), None)
+    name = (teacher_user.get_full_name() or teacher_user.username) if teacher_user else "Faculty"
+    lines = [row.summary for row in rows]
+
+    if channel == 'email':
+        cases = "\n".join(f"- {line}" for line in lines)
+        return f'Malpractice Alert: {len(rows)} New Cases Reviewed', (
+            f"Dear {name},\n\n"
+            f"{len(rows)} malpractices have been detected in your classroom and have been approved by the examination cell.\n\n"
+            f"Details (📅 Date | ⏰ Time | 🎯 Type | 🏫 Lecture Hall):\n"
+            f"{cases}\n\n"
+            f"You can view the recorded video proofs from your AIInvigilator portal.\n\n"
+            f"Best regards,\nAIInvigilator Team"
+        )
+
+    # Keep SMS digests to a few segments
+    shown = lines[:SMS_DIGEST_LINES]
+    more = f"\n+{len(lines) - len(shown)} more" if len(lines) > len(shown) else ""
+    return '', (
+        f"Dear {name},\n\n"
+        f"🔔 {len(rows)} Malpractice Alerts\n"
+        + "\n".join(shown) + more +
+        f"\n\nCheck AIInvigilator for video proof."
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX))
+
+
+class NotificationWorker:
+    """
+    Long-running sender for NotificationOutbox rows.
+
+    Due rows are claimed in batches (SELECT ... FOR UPDATE SKIP LOCKED, and
+    a lease in leased_until) so several workers can run side by side. MariaDB and MySQL before 8.0.1 have no SKIP LOCKED: there a
+    plain FOR UPDATE makes a second worker wait for the claim instead. Rows due for the same recipient go out as a single digest. One
+    SMTP connection stays open while there is mail to send and the SMS
+    backend, and with it the Twilio client, is created once. Failed messages
+    are retried with exponential backoff until MAX_ATTEMPTS.
+    """
+
+    def __init__(self, batch_size=50):
+        self.batch_size = batch_size
+        self.mail = None
+        self.mail_used_at = 0
+        self.sms = get_sms_backend()
+
+    def claim(self):
+        now = timezone.now()
+        features = connection.features
+        lock = {}
+        if features.has_select_for_update_skip_locked:
+            lock['skip_locked'] = True
+        if features.has_select_for_update_of:
+            lock['of'] = ('self',)
+        with transaction.atomic():
+            rows = list(NotificationOutbox.objects
+                        .select_for_update(**lock)
+                        .select_related('detection__lecture_hall__assigned_teacher')
+                        .filter(unleased(now), status='pending', next_attempt_at__lte=now)
+                        .order_by('next_attempt_at')[:self.batch_size])
+            if rows:
+                NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                    leased_until=now + timedelta(seconds=LEASE))
+        return rows
+
+    def mail_connection(self):
+        if self.mail is None:
+            self.mail = get_connection(fail_silently=False)
+            self.mail.open()
+        self.mail_used_at = time.monotonic()
+        return self.mail
+
+    def close_mail(self):
+        if self.mail is not None:
+            try:
+                self.mail.close()
+            except Exception:
+                pass
+            self.mail = None
+
+    def deliver(self, channel, recipient, subject, body):
+        if channel == 'email':
+            message = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient],
+                                   connection=self.mail_connection())
+            try:
+                message.send()
+            except Exception:
+                # The server may have dropped us; reconnect on the next attempt
+                self.close_mail()
+                raise
+        else:
+            self.sms.send(recipient, body)
+
+    def process(self, rows):
+        """Send one message per (channel, recipient): the row itself, or a digest of several."""
+        groups = {}
+        for row in rows:
+            groups.setdefault((row.channel, row.recipient), []).append(row)
+
+        for (channel, recipient), group in groups.items():
+            ids = [row.id for row in group]
+            try:
+                self.deliver(channel, recipient, *digest_message(channel, group))
+            except Exception as e:
+                attempts = max(row.attempts for row in group) + 1
+                if attempts >= MAX_ATTEMPTS:
+                    print(f"[ERROR] Giving up on {channel} to {recipient} ({len(group)} case(s)): {e}")
+                    NotificationOutbox.objects.filter(id__in=ids).update(
+                        status='failed', attempts=attempts, last_error=str(e), leased_until=None)
+                else:
+                    print(f"[WARN] {channel} to {recipient} failed (attempt {attempts}), retrying: {e}")
+                    NotificationOutbox.objects.filter(id__in=ids).update(
+                        attempts=attempts, last_error=str(e), leased_until=None,
+                        next_attempt_at=timezone.now() + retry_delay(attempts))
+            else:
+                NotificationOutbox.objects.filter(id__in=ids).update(
+                    status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, leased_until=None)
+
+    def run_once(self):
+        rows = self.claim()
+        if rows:
+            self.process(rows)
+        return len(rows)
+
+    def run(self, interval=2.0):
+        try:
+            while True:
+                close_old_connections()
+                sent = self.run_once()
+                if not sent:
+                    if self.mail is not None and time.monotonic() - self.mail_used_at > SMTP_IDLE_TIMEOUT:
+                        self.close_mail()
+                    time.sleep(interval)
+        finally:
+            self.close_mail()
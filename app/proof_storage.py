@@ -0,0 +1,109 @@
+# proof_storage.py
+import hashlib
+import os
+import posixpath
+import shutil
+
+from django.conf import settings
+
+from .models import MalpraticeDetection
+from .retention import BATCH
+
+PROOF_ROOT = "proofs"
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def proof_path(day, hall_id, digest, ext=".mp4"):
+    """
+    Where a clip lives under the media root: proofs/YYYY/MM/DD/hall-<id>/<hh>/<sha256>.mp4.
+    Date and hall keep each directory small; the first two hex digits of the
+    hash split a busy hall's day further. Must match ML/postprocess.py:proof_path.
+    """
+    hall = f"hall-{hall_id}" if hall_id else "hall-none"
+    return posixpath.join(PROOF_ROOT, f"{day.year:04d}", f"{day.month:02d}", f"{day.day:02d}",
+                          hall, digest[:2], digest + ext)
+
+
+def is_sharded(proof):
+    return proof.startswith(PROOF_ROOT + "/")
+
+
+def _link_or_copy(src, dest):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Another filesystem, or links not supported: copy under a temporary name
+        tmp_dest = dest + ".part"
+        shutil.copy2(src, tmp_dest)
+        os.replace(tmp_dest, dest)
+
+
+def relocate(log_id, proof, media_state, hall_id, day, dry_run=False):
+    """
+    Move one detection's clip to its sharded path in the root it is already
+    in (MEDIA_ROOT, or the archive). Returns the new proof, or None if the
+    clip is missing. With dry_run, only works out the new proof.
+
+    The file is linked (or copied) first, the row updated second and the old
+    name removed last, so a crash at any point leaves a row that points at
+    a file; a left-over old name is picked up by the orphan scan.
+    """
+    root = settings.MEDIA_ARCHIVE_ROOT if media_state == "archived" else settings.MEDIA_ROOT
+    source = os.path.join(root, proof)
+    if not os.path.exists(source):
+        return None
+    digest = file_digest(source)
+    source_to_link = source
+    new_proof = proof_path(day, hall_id, digest, os.path.splitext(proof)[1] or ".mp4")
+    if MalpraticeDetection.objects.filter(proof=new_proof).exclude(id=log_id).exists():
+        # proof is unique: a second row with the same clip gets its own name,
+        # hard-linked to the first copy so the bytes are stored once
+        shared = os.path.join(root, new_proof)
+        if os.path.exists(shared):
+            source_to_link = shared
+        base, ext = posixpath.splitext(new_proof)
+        new_proof = f"{base}-{log_id}{ext}"
+    if dry_run:
+        return new_proof
+    dest = os.path.join(root, new_proof)
+    if not os.path.exists(dest):
+        _link_or_copy(source_to_link, dest)
+    MalpraticeDetection.objects.filter(id=log_id).update(proof=new_proof)
+    os.remove(source)
+    return new_proof
+
+
+def migrate_proofs(dry_run=False, limit=None):
+    """
+    Move detections still stored under their old flat names into the sharded
+    layout, BATCH rows at a time in id order. Safe to stop and re-run: moved
+    rows no longer match. Yields (id, old proof, new proof or None if missing).
+    """
+    logs = (MalpraticeDetection.objects
+            .exclude(proof__startswith=PROOF_ROOT + "/")
+            .exclude(media_state="deleted")
+            .order_by("id"))
+    last_id = 0
+    seen = 0
+    while limit is None or seen < limit:
+        batch = list(logs.filter(id__gt=last_id)
+                     .values_list("id", "proof", "media_state", "lecture_hall_id", "date")[:BATCH])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        for log_id, proof, media_state, hall_id, day in batch:
+            if limit is not None and seen >= limit:
+                return
+            seen += 1
+            try:
+                yield log_id, proof, relocate(log_id, proof, media_state, hall_id, day, dry_run)
+            except OSError as e:
+                print(f"[ERROR] Could not move proof {proof}: {e}")
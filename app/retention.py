@@ -0,0 +1,236 @@
+# retention.py
+import os
+import shutil
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+
+from .media import safe_media_path
+from .models import MalpraticeDetection
+
+FFMPEG = shutil.which("ffmpeg")
+BATCH = 500                 # detection rows / file names handled per query
+SKIP_DIRS = {"profile_pics"}
+TEMP_SUFFIXES = (".part", ".part.mp4", ".tmp")
+
+REVIEW_STATES = {
+    "pending": Q(verified=False),
+    "approved": Q(verified=True, is_malpractice=True),
+    "rejected": Q(verified=True) & ~Q(is_malpractice=True),
+}
+
+# media_state values each action may start from (None: clip as recorded)
+ACTION_SOURCES = {
+    "transcode": [None],
+    "archive": [None, "compact"],
+    "delete": [None, "compact", "archived"],
+}
+
+
+def proof_file(proof):
+    """Full path of a proof clip, in MEDIA_ROOT or else the archive. Returns (path, archived)."""
+    try:
+        return safe_media_path(settings.MEDIA_ROOT, proof), False
+    except Http404:
+        return safe_media_path(settings.MEDIA_ARCHIVE_ROOT, proof), True
+
+
+def proof_paths(proof):
+    """Everywhere a proof clip may be stored, for deleting it."""
+    return [os.path.join(settings.MEDIA_ROOT, proof), os.path.join(settings.MEDIA_ARCHIVE_ROOT, proof)]
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _move(src, dest):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # shutil.move copies when the archive is on another disk; copy to a
+    # temporary name first so a crash never leaves a truncated clip in place
+    tmp_dest = dest + ".part"
+    shutil.copy2(src, tmp_dest)
+    os.replace(tmp_dest, dest)
+    os.remove(src)
+
+
+def _transcode(path, bitrate="250k", width=640):
+    tmp_path = path + ".part.mp4"
+    try:
+        subprocess.run([
+            FFMPEG, "-y", "-loglevel", "error", "-i", path, "-an",
+            "-vf", f"scale='min({width},iw)':-2",
+            "-c:v", "libx264", "-preset", "slow", "-profile:v", "main", "-pix_fmt", "yuv420p",
+            "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate,
+            "-movflags", "+faststart", "-f", "mp4", tmp_path,
+        ], check=True, capture_output=True, text=True)
+        if os.path.getsize(tmp_path) >= os.path.getsize(path):
+            return False  # already small; keep the original
+        os.replace(tmp_path, path)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def apply_action(action, proof, media_state):
+    """
+    Run one retention action on a clip. Returns (new media_state, bytes freed),
+    or (None, 0) if the clip was left as it is.
+    """
+    local = os.path.join(settings.MEDIA_ROOT, proof)
+    archived = os.path.join(settings.MEDIA_ARCHIVE_ROOT, proof)
+    path = archived if media_state == "archived" else local
+
+    if action == "delete":
+        freed = 0
+        for candidate in (local, archived):
+            if os.path.exists(candidate):
+                freed += _size(candidate)
+                os.remove(candidate)
+        return "deleted", freed
+
+    if not os.path.exists(path):
+        print(f"[WARN] Retention: proof clip missing: {proof}")
+        return None, 0
+
+    if action == "archive":
+        size = _size(path)
+        _move(path, archived)
+        return "archived", size
+
+    if action == "transcode":
+        if not FFMPEG:
+            return None, 0
+        before = _size(path)
+        # Marked compact either way, so a clip that doesn't shrink isn't retried every run
+        _transcode(path)
+        return "compact", before - _size(path)
+
+    raise ValueError(f"Unknown retention action: {action}")
+
+
+def policy_queryset(policy, today=None):
+    today = today or timezone.localdate()
+    cutoff = today - timedelta(days=policy["days"])
+    states = [state for state in ACTION_SOURCES[policy["action"]] if state]
+    state_filter = Q(media_state__isnull=True)
+    if states:
+        state_filter |= Q(media_state__in=states)
+    return (MalpraticeDetection.objects
+            .filter(REVIEW_STATES[policy["state"]], state_filter, date__lt=cutoff))
+
+
+def apply_policy(policy, dry_run=False, limit=None):
+    """
+    Apply one MEDIA_RETENTION_POLICIES entry, BATCH rows at a time in id
+    order. Returns (clips changed, bytes freed); with dry_run, what would be.
+    """
+    logs = policy_queryset(policy)
+    changed = freed = 0
+    last_id = 0
+    while limit is None or changed < limit:
+        batch = list(logs.filter(id__gt=last_id).order_by("id").values_list("id", "proof", "media_state")[:BATCH])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        updates = {}
+        for log_id, proof, media_state in batch:
+            if limit is not None and changed >= limit:
+                break
+            if dry_run:
+                path = os.path.join(settings.MEDIA_ARCHIVE_ROOT if media_state == "archived" else settings.MEDIA_ROOT, proof)
+                changed += 1
+                freed += _size(path)
+                continue
+            try:
+                new_state, saved = apply_action(policy["action"], proof, media_state)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"[ERROR] Retention {policy['action']} failed for {proof}: {e}")
+                continue
+            if new_state:
+                updates.setdefault(new_state, []).append(log_id)
+                changed += 1
+                freed += saved
+        for new_state, ids in updates.items():
+            MalpraticeDetection.objects.filter(id__in=ids).update(media_state=new_state)
+    return changed, freed
+
+
+def _media_files(root):
+    """Yield (directory, [file names]) under `root`, one directory at a time."""
+    for directory, dirs, files in os.walk(root):
+        if directory == root:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        if files:
+            yield directory, files
+
+
+def scan_orphans(action="report", grace=None):
+    """
+    Reconcile MEDIA_ROOT against the detection table: files no row points at
+    (for example a copy whose INSERT failed). Walks one directory at a time
+    and looks names up BATCH at a time on the unique proof index, so neither
+    side is ever loaded whole. Files younger than MEDIA_ORPHAN_GRACE and
+    temporary files are skipped.
+
+    action: "report", "archive" (to MEDIA_ARCHIVE_ROOT/orphans/) or "delete".
+    Returns (orphan count, bytes).
+    """
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    grace = settings.MEDIA_ORPHAN_GRACE if grace is None else grace
+    cutoff = time.time() - grace
+    count = size = 0
+
+    for directory, files in _media_files(root):
+        relative_dir = os.path.relpath(directory, root).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else relative_dir + "/"
+        names = [name for name in files if not name.endswith(TEMP_SUFFIXES)]
+        for start in range(0, len(names), BATCH):
+            chunk = {prefix + name: name for name in names[start:start + BATCH]}
+            known = set(MalpraticeDetection.objects.filter(proof__in=list(chunk)).values_list("proof", flat=True))
+            for proof, name in chunk.items():
+                if proof in known:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_mtime > cutoff:
+                    continue
+                count += 1
+                size += stat.st_size
+                try:
+                    if action == "delete":
+                        os.remove(path)
+                    elif action == "archive":
+                        _move(path, os.path.join(settings.MEDIA_ARCHIVE_ROOT, "orphans", proof))
+                    else:
+                        print(f"[ORPHAN] {proof} ({stat.st_size} bytes)")
+                except OSError as e:
+                    print(f"[ERROR] Could not {action} orphan {proof}: {e}")
+    return count, size
+
+
+def missing_clips():
+    """Detection rows whose clip should exist but is in neither MEDIA_ROOT nor the archive."""
+    last_id = 0
+    logs = MalpraticeDetection.objects.exclude(media_state="deleted").order_by("id")
+    while True:
+        batch = list(logs.filter(id__gt=last_id).values_list("id", "proof", "media_state")[:BATCH])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        for log_id, proof, media_state in batch:
+            root = settings.MEDIA_ARCHIVE_ROOT if media_state == "archived" else settings.MEDIA_ROOT
+            if not os.path.exists(os.path.join(root, proof)):
+                yield log_id, proof
@@ -151,6 +151,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = (str(BASE_DIR.joinpath('static')),)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Media goes through the authenticated protected_media view. Set to "nginx"
+# (X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an `internal` location aliased to
+# MEDIA_ROOT) or "sendfile" (X-Sendfile) to let the front proxy stream the bytes.
+MEDIA_ACCEL_MODE = env('MEDIA_ACCEL_MODE', default=None)
+MEDIA_ACCEL_PREFIX = env('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Cached poster / keyframe-strip images for proof clips, keyed by clip content hash
+THUMBNAIL_ROOT = os.path.join(BASE_DIR, 'thumbnails')
+# Cold storage for old proof clips (e.g. a cheaper disk); still served by protected_media
+MEDIA_ARCHIVE_ROOT = env('MEDIA_ARCHIVE_ROOT', default=os.path.join(BASE_DIR, 'media_archive'))
+# Applied in order by `manage.py apply_media_retention` to clips older than `days`
+# (by detection date). state: pending / approved / rejected; action: delete /
+# archive (move to MEDIA_ARCHIVE_ROOT) / transcode (re-encode at a low bitrate).
+MEDIA_RETENTION_POLICIES = [
+    {'state': 'rejected', 'days': 30, 'action': 'delete'},
+    {'state': 'pending', 'days': 90, 'action': 'archive'},
+    {'state': 'approved', 'days': 60, 'action': 'transcode'},
+    {'state': 'approved', 'days': 365, 'action': 'archive'},
+]
+# Files in MEDIA_ROOT with no detection row are only touched once this old (seconds),
+# so clips still being copied in before their INSERT are left alone
+MEDIA_ORPHAN_GRACE = 6 * 60 * 60
+
+# Page metadata cache (app/cache.py). Local memory by default: the site runs
+# as one uvicorn process (start.sh) whose DJANGO_THREADS request threads share
+# it. Changes made by other processes (management commands, camera inserts)
+# only show after PAGE_CACHE_TTL; if the site is ever run as several
+# processes, set CACHE_URL to a shared cache (e.g. pymemcache://127.0.0.1:11211
+# or redis://...) so invalidations reach all of them.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# Upper bound on staleness for changes no signal reports (camera inserts)
+PAGE_CACHE_TTL = env('PAGE_CACHE_TTL', default=60, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -159,15 +192,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Email settings
 EMAIL_BACKEND = 'app.custom_email_backend.CustomEmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# For local testing: EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False with an
+# empty EMAIL_HOST_PASSWORD, against `python -m aiosmtpd -n -l localhost:1025`
+EMAIL_HOST = env('EMAIL_HOST', default='smtp.gmail.com')
+EMAIL_PORT = env('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = env('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = 30
 EMAIL_HOST_USER = env('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 
 # Twilio Config
 TWILIO_ACCOUNT_SID = env('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = env('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER')
\ No newline at end of file
+TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER')
+# 'app.notifications.ConsoleSMSBackend' / 'app.notifications.LocmemSMSBackend' for testing
+SMS_BACKEND = env('SMS_BACKEND', default='app.notifications.TwilioSMSBackend')
+# Approvals for the same teacher within this many seconds are sent as one digest,
+# delayed at most NOTIFICATION_DIGEST_MAX_DELAY seconds after the first
+NOTIFICATION_DIGEST_WINDOW = env('NOTIFICATION_DIGEST_WINDOW', default=120, cast=int)
+NOTIFICATION_DIGEST_MAX_DELAY = env('NOTIFICATION_DIGEST_MAX_DELAY', default=600, cast=int)
+
+# Camera scripts started from the Run Cameras page.
+# "local" configs run under app.supervisor on this machine; "cores" (optional) pins the
+# worker to those CPUs and "env" (optional) is passed through, e.g. {"TILED_INFERENCE": "1"}.
+# "remote" configs are started over SSH on the client laptops.
+CAMERA_CONFIGS = [
+    {
+        "name": "Top Corner - Host(Allen 2)",
+        "script_path": "C:\\Users\\noelm\\Documents\\PROJECTS\\AIInvigilator\\ML\\front.py",
+        "mode": "local",
+        # Live preview on the Run Cameras page; remote configs can set "preview_port" the same way
+        "preview_port": 8101,
+        "env": {"PREVIEW_PORT": 8101, "HEADLESS": 1}
+    },
+    # {
+    #     "name": "Top Corner Angle - Remote Client(Allen)",
+    #     "ip": "192.168.154.9",
+    #     "username": "allen",
+    #     "password": "5213",
+    #     "script_path": "D:\\application\\ML\\top_corner.py",
+    #     "mode": "remote",
+    #     "use_venv": False  # disable venv activation for this host
+    # },
+    # {
+    #     "name": "Front Angle - Remote Client(Shruti)",
+    #     "ip": "192.168.39.145",
+    #     "username": "SHRUTI S",
+    #     "password": "1234shibu",
+    #     "script_path": "C:\\Users\\SHRUTI S\\Documents\\Repos\\AIInvigilator\\application\\application\\ML\\front.py",
+    #     "mode": "remote",
+    #     "use_venv": False
+    # },
+    # {
+    #     "name": "Front Angle - Remote Client(Noel)",
+    #     "ip": "192.168.1.8",
+    #     "username": "noelmathen",
+    #     "password": "134652",
+    #     "mode": "remote",
+    #     "script_path": "C:\\Users\\noelmathen\\Documents\\PROJECTS\\AIInvigilator\\ML\\front.py",
+    #     "use_venv": True
+    # }
+]
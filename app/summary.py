@@ -0,0 +1,243 @@
+# summary.py
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import DailyDetectionSummary, DetectionSummaryState, MalpraticeDetection
+
+SYNC_BATCH = 50000  # detection ids folded into the summary per GROUP BY
+# Camera INSERTs can commit out of id order; an id this close to the newest
+# one that had no row when its range was counted is checked again later
+GAP_WINDOW = 1000
+
+STATUS_COUNTS = {
+    "pending": Count("id", filter=Q(verified=False)),
+    "approved": Count("id", filter=Q(verified=True, is_malpractice=True)),
+    "rejected": Count("id", filter=Q(verified=True) & ~Q(is_malpractice=True)),
+}
+
+
+def review_status(verified, is_malpractice):
+    """Which DailyDetectionSummary counter a detection falls under."""
+    if not verified:
+        return "pending"
+    return "approved" if is_malpractice else "rejected"
+
+
+def locked_watermark():
+    """
+    Lock the summary state for the rest of the transaction and return it;
+    `state.counts(id)` tells whether a detection is already counted.
+
+    Every writer takes this lock first, so a detection is either folded in by
+    sync_summary() or adjusted by a review/delete, never both.
+    """
+    DetectionSummaryState.objects.get_or_create(pk=1)
+    return DetectionSummaryState.objects.select_for_update().get(pk=1)
+
+
+def apply_delta(day, hall_id, malpractice, **deltas):
+    """Add `deltas` (e.g. total=1, pending=-1) to one summary row, creating it if needed."""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    rows = DailyDetectionSummary.objects.filter(date=day, lecture_hall_id=hall_id, malpractice=malpractice)
+    # Update a single row: rows left without a hall by a hall delete can share a key
+    row_id = rows.values_list("id", flat=True).first()
+    if row_id is not None:
+        DailyDetectionSummary.objects.filter(id=row_id).update(**changes)
+        return
+    try:
+        with transaction.atomic():
+            DailyDetectionSummary.objects.create(date=day, lecture_hall_id=hall_id, malpractice=malpractice,
+                                                 **{field: max(delta, 0) for field, delta in deltas.items()})
+    except IntegrityError:
+        # Created concurrently; add to that row instead
+        DailyDetectionSummary.objects.filter(id=rows.values_list("id", flat=True).first()).update(**changes)
+
+
+def apply_deltas(deltas):
+    """
+    apply_delta() for each {(day, hall_id, malpractice): {field: delta}},
+    with the existing summary rows looked up in one query.
+    """
+    if not deltas:
+        return
+    row_ids = {}
+    rows = (DailyDetectionSummary.objects.filter(date__in={day for day, hall_id, malpractice in deltas})
+            .values_list("id", "date", "lecture_hall_id", "malpractice"))
+    for row_id, day, hall_id, malpractice in rows:
+        row_ids.setdefault((day, hall_id, malpractice), row_id)
+    for key, counts in deltas.items():
+        changes = {field: F(field) + delta for field, delta in counts.items() if delta}
+        if not changes:
+            continue
+        if key in row_ids:
+            DailyDetectionSummary.objects.filter(id=row_ids[key]).update(**changes)
+        else:
+            apply_delta(*key, **counts)
+
+
+def record_reviews(reviews, watermark):
+    """
+    Move reviewed detections between counters, given (log, status before
+    the review) pairs. Call after locked_watermark(), in the same transaction.
+    """
+    deltas = {}
+    for log, old_status in reviews:
+        new_status = review_status(log.verified, log.is_malpractice)
+        if watermark.counts(log.id) and new_status != old_status:
+            counts = deltas.setdefault((log.date, log.lecture_hall_id, log.malpractice), Counter())
+            counts[old_status] -= 1
+            counts[new_status] += 1
+    apply_deltas(deltas)
+
+
+def deleted_row(log):
+    """What record_deletes() needs of a detection; the ORM clears its id once the delete is done."""
+    return log.id, log.date, log.lecture_hall_id, log.malpractice, review_status(log.verified, log.is_malpractice)
+
+
+def record_deletes(rows, watermark):
+    """
+    Take deleted detections (deleted_row() tuples) off their counters, one
+    update per (date, hall, type) rather than per row. Call after
+    locked_watermark(), in the same transaction.
+    """
+    deltas = {}
+    for log_id, day, hall_id, malpractice, status in rows:
+        if watermark.counts(log_id):
+            counts = deltas.setdefault((day, hall_id, malpractice), Counter())
+            counts["total"] -= 1
+            counts[status] -= 1
+    apply_deltas(deltas)
+
+
+_deleting = threading.local()
+
+
+@contextmanager
+def grouped_deletes():
+    """
+    Collect every detection deleted inside the block and update the summary
+    for all of them at once on the way out, under a single lock:
+
+        with summary.grouped_deletes():
+            MalpraticeDetection.objects.filter(id__in=ids).delete()
+    """
+    if getattr(_deleting, "rows", None) is not None:
+        yield  # already collecting
+        return
+    with transaction.atomic():
+        watermark = locked_watermark()
+        _deleting.rows = []
+        try:
+            yield
+            record_deletes(_deleting.rows, watermark)
+        finally:
+            _deleting.rows = None
+
+
+@receiver(post_delete, sender=MalpraticeDetection)
+def record_delete(sender, instance, **kwargs):
+    rows = getattr(_deleting, "rows", None)
+    if rows is not None:
+        rows.append(deleted_row(instance))
+        return
+    # Deletes run in a transaction, so the lock is held until the row is gone
+    record_deletes([deleted_row(instance)], locked_watermark())
+
+
+def _fold(logs):
+    """Add `logs` to the summary with one GROUP BY. Returns how many were added."""
+    groups = (logs.values("date", "lecture_hall_id", "malpractice")
+              .annotate(total=Count("id"), **STATUS_COUNTS)
+              .order_by())
+    deltas = {
+        (group["date"], group["lecture_hall_id"], group["malpractice"]):
+            {field: group[field] for field in ("total", "pending", "approved", "rejected")}
+        for group in groups
+    }
+    apply_deltas(deltas)
+    return sum(counts["total"] for counts in deltas.values())
+
+
+def _missing_ids(after, upto):
+    """Ids in (after, upto], within GAP_WINDOW of `upto`, that have no detection row yet."""
+    after = max(after, upto - GAP_WINDOW)
+    present = set(MalpraticeDetection.objects.filter(id__gt=after, id__lte=upto).values_list("id", flat=True))
+    return [log_id for log_id in range(after + 1, upto + 1) if log_id not in present]
+
+
+def _has_unsynced():
+    """Cheap check, without the lock, for anything sync_summary() would fold in."""
+    state = DetectionSummaryState.objects.filter(pk=1).values_list("last_id", "gaps").first()
+    if state is None:
+        return True
+    last_id, gaps = state
+    return (MalpraticeDetection.objects.filter(id__gt=last_id).exists()
+            or bool(gaps) and MalpraticeDetection.objects.filter(id__in=gaps).exists())
+
+
+def sync_summary():
+    """
+    Fold detections inserted since the last call into the summary.
+
+    The camera scripts insert with raw SQL, so new rows are found by id
+    rather than by signal. Each step is one GROUP BY over a primary-key
+    range, so the cost follows the number of new rows, not the table size.
+    Concurrent INSERTs can commit out of id order, so ids near the top of a
+    counted range that had no row yet are kept in `gaps` and folded in if
+    they turn up. When there is nothing new the lock is never taken.
+    Returns the number of detections folded in.
+    """
+    if not _has_unsynced():
+        return 0
+    folded = 0
+    while True:
+        with transaction.atomic():
+            state = locked_watermark()
+            if state.gaps:
+                late = set(MalpraticeDetection.objects.filter(id__in=state.gaps).values_list("id", flat=True))
+                if late:
+                    folded += _fold(MalpraticeDetection.objects.filter(id__in=late))
+                    state.gaps = [log_id for log_id in state.gaps if log_id not in late]
+            latest = MalpraticeDetection.objects.filter(id__gt=state.last_id).aggregate(latest=Max("id"))["latest"]
+            if latest is None:
+                state.save()
+                return folded
+            upto = min(latest, state.last_id + SYNC_BATCH)
+            folded += _fold(MalpraticeDetection.objects.filter(id__gt=state.last_id, id__lte=upto))
+            state.gaps = ([log_id for log_id in state.gaps if log_id > upto - GAP_WINDOW]
+                          + _missing_ids(state.last_id, upto))
+            state.last_id = upto
+            state.save()
+
+
+def rebuild_summary():
+    """Recount the whole summary from MalpraticeDetection in one GROUP BY. Returns the number of summary rows."""
+    with transaction.atomic():
+        state = locked_watermark()
+        latest = MalpraticeDetection.objects.aggregate(latest=Max("id"))["latest"] or 0
+        DailyDetectionSummary.objects.all().delete()
+        groups = (MalpraticeDetection.objects
+                  .filter(id__lte=latest)
+                  .values("date", "lecture_hall_id", "malpractice")
+                  .annotate(total=Count("id"), **STATUS_COUNTS)
+                  .order_by())
+        rows = DailyDetectionSummary.objects.bulk_create(
+            (DailyDetectionSummary(date=group["date"], lecture_hall_id=group["lecture_hall_id"],
+                                   malpractice=group["malpractice"], total=group["total"],
+                                   pending=group["pending"], approved=group["approved"],
+                                   rejected=group["rejected"])
+             for group in groups.iterator()),
+            batch_size=1000)
+        state.last_id = latest
+        state.gaps = _missing_ids(0, latest)
+        state.save()
+    return len(rows)
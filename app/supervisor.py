@@ -0,0 +1,207 @@
+# supervisor.py
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import psutil
+
+# Camera workers print "[STATS] frames=... fps=..." lines (see ML/concurrent_inference.py)
+STATS_RE = re.compile(r"\[STATS\].*?\bfps=([\d.]+)")
+
+MAX_BACKOFF = 60    # seconds between restarts of a worker that keeps crashing
+STABLE_AFTER = 60   # a worker that ran this long before exiting restarts without delay build-up
+
+
+class CameraWorker:
+    """
+    One camera script running as a child process.
+    Output is drained on a background thread into a bounded ring buffer so
+    the pipe never fills up and blocks the child.
+    """
+
+    def __init__(self, config, cores, log_lines=200):
+        self.name = config["name"]
+        self.script_path = config["script_path"]
+        self.python = config.get("python", sys.executable)
+        self.extra_env = config.get("env", {})
+        self.cores = cores
+        self.logs = deque(maxlen=log_lines)
+        self.process = None
+        self.started_at = None
+        self.fps = None
+        self.restarts = 0
+        self.backoff = 1
+        self.next_start = 0
+        self.stopping = False
+
+    def start(self):
+        threads = str(max(1, len(self.cores)))
+        env = os.environ.copy()
+        env.update({
+            # Keep torch/OpenMP/BLAS inside the cores this worker is pinned to
+            "OMP_NUM_THREADS": threads,
+            "MKL_NUM_THREADS": threads,
+            "OPENBLAS_NUM_THREADS": threads,
+            "PYTHONUNBUFFERED": "1",
+        })
+        env.update({k: str(v) for k, v in self.extra_env.items()})
+
+        self.process = subprocess.Popen(
+            [self.python, "-u", os.path.basename(self.script_path)],
+            cwd=os.path.dirname(self.script_path) or None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            # OpenCV / ffmpeg can print bytes that aren't UTF-8; a decode error
+            # would kill the drain thread and leave the child blocked on a full pipe
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            env=env
+        )
+        self.started_at = time.time()
+        self.fps = None
+        self.stopping = False
+        self._pin()
+        threading.Thread(target=self._drain, args=(self.process,), daemon=True).start()
+        print(f"[Supervisor] {self.name} started (pid {self.process.pid}, cores {self.cores}).")
+
+    def _pin(self):
+        try:
+            proc = psutil.Process(self.process.pid)
+            if self.cores and hasattr(proc, "cpu_affinity"):
+                proc.cpu_affinity(self.cores)
+        except (psutil.Error, OSError) as e:
+            print(f"[Supervisor] Could not pin {self.name} to cores {self.cores}: {e}")
+
+    def _drain(self, process):
+        for line in process.stdout:
+            line = line.rstrip()
+            self.logs.append(line)
+            match = STATS_RE.search(line)
+            if match:
+                self.fps = float(match.group(1))
+        process.stdout.close()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self, timeout=5):
+        self.stopping = True
+        if not self.is_running():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        print(f"[Supervisor] {self.name} stopped.")
+
+    def check(self, now):
+        """Restart a crashed worker, backing off exponentially while it keeps crashing."""
+        if self.stopping or self.process is None or self.is_running():
+            return
+        if self.next_start == 0:
+            ran_for = now - self.started_at
+            if ran_for >= STABLE_AFTER:
+                self.backoff = 1
+            self.logs.append(f"[Supervisor] exited with code {self.process.returncode}; "
+                             f"restarting in {self.backoff}s")
+            self.next_start = now + self.backoff
+            self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+        elif now >= self.next_start:
+            self.next_start = 0
+            self.restarts += 1
+            self.start()
+
+    def status(self):
+        rss_mb = None
+        if self.is_running():
+            try:
+                rss_mb = round(psutil.Process(self.process.pid).memory_info().rss / (1024 * 1024), 1)
+            except psutil.Error:
+                pass
+        if self.is_running():
+            state = "running"
+        elif self.stopping:
+            state = "stopped"
+        else:
+            state = "restarting"
+        return {
+            "name": self.name,
+            "mode": "local",
+            "state": state,
+            "pid": self.process.pid if self.process else None,
+            "cores": self.cores,
+            "fps": self.fps,
+            "rss_mb": rss_mb,
+            "restarts": self.restarts,
+            "uptime": int(time.time() - self.started_at) if self.is_running() else 0,
+            "last_log": self.logs[-1] if self.logs else "",
+        }
+
+
+class Supervisor:
+    """Launches one worker per local camera config and keeps them alive."""
+
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+        self.workers = {}
+        self.lock = threading.Lock()
+        self.monitor = None
+
+    def _assign_cores(self, configs):
+        """Use each config's "cores" if given, otherwise split the CPUs evenly between workers."""
+        cpus = list(range(os.cpu_count() or 1))
+        share = max(1, len(cpus) // max(1, len(configs)))
+        assigned = []
+        for i, config in enumerate(configs):
+            cores = config.get("cores")
+            if not cores:
+                cores = cpus[(i * share) % len(cpus):][:share] or cpus[:share]
+            assigned.append(list(cores))
+        return assigned
+
+    def start(self, configs):
+        with self.lock:
+            for config, cores in zip(configs, self._assign_cores(configs)):
+                worker = self.workers.get(config["name"])
+                if worker and worker.is_running():
+                    continue
+                worker = CameraWorker(config, cores)
+                self.workers[config["name"]] = worker
+                worker.start()
+            if self.monitor is None or not self.monitor.is_alive():
+                self.monitor = threading.Thread(target=self._monitor, daemon=True)
+                self.monitor.start()
+
+    def stop_all(self, timeout=5):
+        with self.lock:
+            workers = list(self.workers.values())
+            # Signal every worker first so they shut down in parallel
+            for worker in workers:
+                worker.stopping = True
+                if worker.is_running():
+                    worker.process.terminate()
+            for worker in workers:
+                worker.stop(timeout)
+
+    def _monitor(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                for worker in self.workers.values():
+                    worker.check(now)
+            time.sleep(self.poll_interval)
+
+    def status(self):
+        with self.lock:
+            return [worker.status() for worker in self.workers.values()]
+
+
+supervisor = Supervisor()
@@ -0,0 +1,446 @@
+# tests.py
+import datetime
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import camera_jobs, thumbnails
+from .exports import export_rows
+from .media import _parse_range
+from .models import LectureHall, MalpraticeDetection, NotificationOutbox, TeacherProfile
+from .notifications import MAX_ATTEMPTS, LocmemSMSBackend, NotificationWorker
+from .supervisor import CameraWorker
+from .utils import SSHPool
+
+
+def make_detection(hall, index=0, **fields):
+    return MalpraticeDetection.objects.create(
+        date=datetime.date(2025, 1, 1), time=datetime.time(10, index % 60), malpractice="Mobile Phone",
+        proof=f"clip_{hall.id if hall else 'none'}_{index}.mp4", lecture_hall=hall, **fields)
+
+
+class FailingSMSBackend:
+    def send(self, to_phone, body):
+        raise ConnectionError("SMS gateway unreachable")
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    SMS_BACKEND="app.notifications.LocmemSMSBackend",
+    NOTIFICATION_DIGEST_WINDOW=0,
+    NOTIFICATION_DIGEST_MAX_DELAY=0,
+)
+class NotificationTests(TestCase):
+    def setUp(self):
+        LocmemSMSBackend.outbox.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.teacher = User.objects.create_user("teacher", "teacher@example.com", "pw", first_name="Asha")
+        TeacherProfile.objects.create(user=self.teacher, phone="9876543210")
+        self.hall = LectureHall.objects.create(building="MAIN", hall_name="LH1", assigned_teacher=self.teacher)
+        self.client.force_login(self.admin)
+
+    def review(self, log, decision="yes"):
+        return self.client.post("/review_malpractice/", json.dumps({"proof": log.proof, "decision": decision}),
+                                content_type="application/json")
+
+    def send_due(self):
+        worker = NotificationWorker()
+        try:
+            return worker.run_once()
+        finally:
+            worker.close_mail()
+
+    def test_approval_is_queued_and_sent_by_the_worker(self):
+        log = make_detection(self.hall)
+        self.assertTrue(self.review(log).json()["success"])
+        self.assertEqual(NotificationOutbox.objects.filter(status="pending").count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(self.send_due(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["teacher@example.com"])
+        self.assertIn("Mobile Phone", mail.outbox[0].body)
+        self.assertEqual(len(LocmemSMSBackend.outbox), 1)
+        self.assertEqual(LocmemSMSBackend.outbox[0][0], "+919876543210")
+        self.assertEqual(NotificationOutbox.objects.filter(status="sent").count(), 2)
+
+    def test_rejection_sends_nothing(self):
+        self.review(make_detection(self.hall), decision="no")
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_approvals_for_one_teacher_go_out_as_one_digest(self):
+        for index in range(3):
+            self.review(make_detection(self.hall, index))
+        self.send_due()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("3 New Cases", mail.outbox[0].subject)
+        self.assertEqual(len(LocmemSMSBackend.outbox), 1)
+        self.assertIn("3 Malpractice Alerts", LocmemSMSBackend.outbox[0][1])
+
+    def test_new_approval_does_not_cut_a_claimed_rows_lease(self):
+        self.review(make_detection(self.hall, 0))
+        claimed = NotificationWorker().claim()  # a worker is still sending these
+        self.assertEqual(len(claimed), 2)
+        second = make_detection(self.hall, 1)
+        self.review(second)
+
+        again = NotificationWorker().claim()
+        self.assertEqual({row.detection_id for row in again}, {second.id})
+        self.assertFalse(NotificationOutbox.objects.filter(id__in=[row.id for row in claimed + again],
+                                                           leased_until__isnull=True).exists())
+
+    @override_settings(SMS_BACKEND="app.tests.FailingSMSBackend")
+    def test_failed_messages_are_retried_then_given_up(self):
+        self.review(make_detection(self.hall))
+        self.send_due()
+        sms = NotificationOutbox.objects.get(channel="sms")
+        self.assertEqual((sms.status, sms.attempts), ("pending", 1))
+        self.assertGreater(sms.next_attempt_at, timezone.now())
+        self.assertEqual(NotificationOutbox.objects.get(channel="email").status, "sent")
+
+        for _ in range(2, MAX_ATTEMPTS + 1):
+            NotificationOutbox.objects.filter(id=sms.id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.send_due()
+        sms.refresh_from_db()
+        self.assertEqual((sms.status, sms.attempts), ("failed", MAX_ATTEMPTS))
+        self.assertIn("unreachable", sms.last_error)
+
+
+class QueryCountTests(TestCase):
+    """
+    Each page runs a fixed number of queries however many rows it shows, so
+    an N+1 regression fails here. Counts are for a warm page cache (app/cache.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.teacher = User.objects.create_user("teacher", "teacher@example.com", "pw")
+        TeacherProfile.objects.create(user=self.teacher, phone="9876543210")
+        self.hall = LectureHall.objects.create(building="MAIN", hall_name="LH1", assigned_teacher=self.teacher)
+
+    def add_detections(self, count):
+        start = MalpraticeDetection.objects.count()
+        for index in range(start, start + count):
+            make_detection(self.hall, index, verified=index % 2 == 0, is_malpractice=True)
+
+    def add_teachers(self, count):
+        start = User.objects.count()
+        for index in range(start, start + count):
+            user = User.objects.create_user(f"teacher{index}", f"teacher{index}@example.com", "pw")
+            TeacherProfile.objects.create(user=user, phone=str(9000000000 + index))
+            LectureHall.objects.create(building="KE", hall_name=f"LH{index}", assigned_teacher=user)
+
+    def assert_constant_queries(self, user, url, add_rows, queries, params=None):
+        self.client.force_login(user)
+        for rows in (2, 20):
+            add_rows(rows)
+            self.client.get(url, params)  # fill the page cache
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+
+    def test_admin_log(self):
+        self.assert_constant_queries(self.admin, "/malpractice_log/", self.add_detections, 3)
+
+    def test_admin_log_reviewed(self):
+        self.assert_constant_queries(self.admin, "/malpractice_log/", self.add_detections, 3, {"review": "reviewed"})
+
+    def test_teacher_log(self):
+        self.assert_constant_queries(self.teacher, "/malpractice_log/", self.add_detections, 4)
+
+    def test_view_teachers(self):
+        self.assert_constant_queries(self.admin, "/view_teachers/", self.add_teachers, 4)
+
+
+class LogCursorTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.logs = [make_detection(None, index) for index in range(3)]
+        self.client.force_login(self.admin)
+
+    def load_more(self, cursor):
+        response = self.client.get("/malpractice_log/", {"after": cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["count"]
+
+    def test_cursor_continues_after_the_row(self):
+        newest = self.logs[-1]
+        self.assertEqual(self.load_more(f"2025-01-01_{newest.time.isoformat()}_{newest.id}"), 2)
+
+    def test_invalid_cursor_falls_back_to_the_first_page(self):
+        for cursor in ("foo_bar_1", "2025-13-01_10:00:00_1", "2025-01-01_25:00:00_1", "2025-01-01_10:00:00_x", "x"):
+            self.assertEqual(self.load_more(cursor), 3, cursor)
+
+
+def write_clip(path, frames=10):
+    import cv2
+    import numpy as np
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for index in range(frames):
+        writer.write(np.full((48, 64, 3), index * 20, np.uint8))
+    writer.release()
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.media_root = os.path.join(self.root, "media")
+        os.makedirs(self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_MODE=None,
+                                     THUMBNAIL_ROOT=os.path.join(self.root, "thumbnails"))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.teacher = User.objects.create_user("teacher", "teacher@example.com", "pw")
+        self.hall = LectureHall.objects.create(building="MAIN", hall_name="LH1", assigned_teacher=self.teacher)
+        self.log = make_detection(self.hall, verified=True, is_malpractice=True)
+        write_clip(os.path.join(self.media_root, self.log.proof))
+
+    def test_thumbnail_is_generated_in_the_background(self):
+        self.client.force_login(self.admin)
+        url = f"/proof_thumbnail/{self.log.id}/poster/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "2")
+
+        with thumbnails._pending_lock:
+            jobs = list(thumbnails._pending.values())
+        for job in jobs:
+            job.result(timeout=10)
+        deadline = time.monotonic() + 2  # the done callback runs just after result() returns
+        while thumbnails._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(thumbnails._pending, {})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_hash_memo_is_bounded(self):
+        with mock.patch.object(thumbnails, "MEMO_SIZE", 2):
+            for index in range(3):
+                path = os.path.join(self.root, f"clip{index}.mp4")
+                write_clip(path, frames=index + 1)
+                thumbnails.content_hash(path)
+            self.assertEqual(len(thumbnails._hash_cache), 2)
+
+    def test_admins_can_open_files_without_a_detection(self):
+        write_clip(os.path.join(self.media_root, "orphan.mp4"))
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get("/media/orphan.mp4").status_code, 200)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get("/media/orphan.mp4").status_code, 404)
+        self.assertEqual(self.client.get(f"/media/{self.log.proof}").status_code, 200)
+
+
+class RangeParsingTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = {
+            "bytes=0-9": (0, 9),
+            "bytes=5-": (5, 99),
+            "bytes=90-200": (90, 99),
+            "bytes=-10": (90, 99),
+            "bytes=5-2": None,        # invalid: serve the whole file
+            "bytes=0-1,5-6": None,    # multiple ranges are not supported
+            "items=0-9": None,
+            "bytes=100-": False,      # valid but past the end: 416
+            "bytes=-0": False,
+        }
+        for header, expected in cases.items():
+            self.assertEqual(_parse_range(header, 100), expected, header)
+
+
+class CameraWorkerTests(SimpleTestCase):
+    def test_output_that_is_not_utf8_is_drained(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        script = os.path.join(folder, "camera.py")
+        with open(script, "w") as f:
+            f.write("import sys\n"
+                    "sys.stdout.buffer.write(b'codec says \\xff\\xfe\\n')\n"
+                    "print('[STATS] frames=10 fps=12.5')\n")
+        worker = CameraWorker({"name": "cam", "script_path": script}, cores=[])
+        worker.start()
+        worker.process.wait(timeout=10)
+        deadline = time.monotonic() + 5
+        while worker.fps is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(worker.fps, 12.5)
+        self.assertIn("codec says \ufffd\ufffd", worker.logs[0])
+
+
+class UndatedDetectionTests(TestCase):
+    """date and time are nullable; keyset paging must neither fail on such rows nor skip past them."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        hall = LectureHall.objects.create(building="MAIN", hall_name="LH1")
+        self.ids = {make_detection(hall, index).id for index in range(3)}
+        for index, (day, at) in enumerate([(None, None), (None, datetime.time(9)),
+                                           (datetime.date(2025, 1, 1), None),
+                                           (datetime.date(2025, 1, 1), datetime.time(10, 1))] * 2):
+            self.ids.add(MalpraticeDetection.objects.create(date=day, time=at, malpractice="Mobile Phone",
+                                                            proof=f"undated_{index}.mp4", lecture_hall=hall).id)
+
+    def test_export_pages_past_undated_rows(self):
+        logs = MalpraticeDetection.objects.order_by('-date', '-time', '-id')
+        for chunk_size in (1, 2, 3):
+            exported = [row[0] for row in export_rows(logs, chunk_size=chunk_size)]
+            self.assertEqual(exported, list(logs.values_list('id', flat=True)), chunk_size)
+
+
+    def test_log_pages_past_undated_rows(self):
+        self.client.force_login(self.admin)
+        seen = []
+        with mock.patch("app.views.LOG_PAGE_SIZE", 2):
+            response = self.client.get("/malpractice_log/")
+            seen += [log.id for log in response.context["result"]]
+            cursor = response.context["next_cursor"]
+            while cursor:
+                data = self.client.get("/malpractice_log/", {"after": cursor}).json()
+                seen += [int(row_id) for row_id in re.findall(r'data-log-id="(\d+)"', data["html"])]
+                cursor = data["next_cursor"]
+        self.assertEqual(sorted(seen), sorted(self.ids))
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeSSHClient:
+    """Stands in for paramiko.SSHClient; connecting to a host in `slow` takes `delay` seconds."""
+    slow = set()
+    delay = 0.5
+    connects = []
+
+    def __init__(self):
+        self.transport = None
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, ip, **kwargs):
+        self.connects.append(ip)
+        if ip in self.slow:
+            time.sleep(self.delay)
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        if self.transport:
+            self.transport.active = False
+
+
+@mock.patch("app.utils.paramiko.SSHClient", FakeSSHClient)
+class SSHPoolTests(SimpleTestCase):
+    def setUp(self):
+        FakeSSHClient.slow = {"10.0.0.1"}
+        FakeSSHClient.connects = []
+        self.pool = SSHPool()
+
+    def test_connection_is_reused_while_alive(self):
+        first = self.pool.get("10.0.0.2", "cam", "pw")
+        self.assertIs(self.pool.get("10.0.0.2", "cam", "pw"), first)
+        first.close()
+        self.assertIsNot(self.pool.get("10.0.0.2", "cam", "pw"), first)
+        self.assertEqual(FakeSSHClient.connects, ["10.0.0.2", "10.0.0.2"])
+
+    def test_slow_host_does_not_block_other_hosts(self):
+        slow = threading.Thread(target=self.pool.get, args=("10.0.0.1", "cam", "pw"))
+        slow.start()
+        time.sleep(0.05)  # the slow connect is under way
+        start = time.monotonic()
+        self.pool.get("10.0.0.2", "cam", "pw")
+        self.assertLess(time.monotonic() - start, FakeSSHClient.delay / 2)
+        slow.join()
+
+
+class CameraJobTimeoutTests(SimpleTestCase):
+    def test_late_result_does_not_overwrite_timeout(self):
+        finished = threading.Event()
+
+        def slow_host():
+            time.sleep(0.3)
+            finished.set()
+            return True, "started"
+
+        with mock.patch.object(camera_jobs, "SSH_TIMEOUT", 0.05):
+            job = camera_jobs._new_job("start", ["slow", "fast"])
+            camera_jobs._fan_out(job, [("slow", slow_host), ("fast", lambda: (True, "started"))])
+        self.assertTrue(job["done"])
+        self.assertEqual(job["hosts"]["fast"]["state"], "ok")
+        self.assertEqual(job["hosts"]["slow"]["state"], "timeout")
+
+        self.assertTrue(finished.wait(2))
+        time.sleep(0.05)
+        self.assertEqual(job["hosts"]["slow"]["state"], "timeout")
+
+
+    def test_hosts_queued_behind_the_pool_are_not_timed_out(self):
+        # More hosts than workers: the later ones wait for a worker longer than the timeout
+        def host():
+            time.sleep(0.04)
+            return True, "started"
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        with mock.patch.object(camera_jobs, "SSH_TIMEOUT", 0.05), mock.patch.object(camera_jobs, "_executor", pool):
+            names = [f"room{index}" for index in range(10)]
+            job = camera_jobs._new_job("start", names)
+            camera_jobs._fan_out(job, [(name, host) for name in names])
+        self.assertEqual({host["state"] for host in job["hosts"].values()}, {"ok"})
+
+
+CSRF_TOKEN = "a" * 64  # any well-formed token; the cookie and the header just have to agree
+
+
+class BulkEndpointCSRFTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.log = make_detection(None)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.admin)
+
+    def post(self, url, body, token=None, content_type="application/json"):
+        headers = {}
+        if token:
+            self.client.cookies["csrftoken"] = token
+            headers["HTTP_X_CSRFTOKEN"] = token
+        return self.client.post(url, json.dumps(body), content_type=content_type, **headers)
+
+    def test_bulk_delete_needs_a_csrf_token(self):
+        self.assertEqual(self.post("/bulk_delete_malpractice/", {"ids": [self.log.id]}).status_code, 403)
+        self.assertTrue(MalpraticeDetection.objects.filter(id=self.log.id).exists())
+
+        response = self.post("/bulk_delete_malpractice/", {"ids": [self.log.id]}, token=CSRF_TOKEN)
+        self.assertEqual(response.json()["deleted"], [self.log.id])
+
+    def test_bulk_review_needs_a_csrf_token(self):
+        body = {"ids": [self.log.id], "decision": "no"}
+        self.assertEqual(self.post("/bulk_review_malpractice/", body).status_code, 403)
+        response = self.post("/bulk_review_malpractice/", body, token=CSRF_TOKEN)
+        self.assertEqual(response.json()["updated"], [self.log.id])
+
+    def test_bulk_requests_must_be_json(self):
+        response = self.post("/bulk_delete_malpractice/", {"ids": [self.log.id]}, token=CSRF_TOKEN,
+                             content_type="text/plain")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,164 @@
+# thumbnails.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+POSTER_WIDTH = 320
+SPRITE_FRAME_WIDTH = 160
+SPRITE_FRAMES = 8
+MEMO_SIZE = 4096       # clip versions whose hash (or undecodability) is remembered
+GENERATE_WORKERS = 2   # clips decoded at once, off the request threads
+
+PENDING = "pending"  # get_thumbnail: the images are being generated
+
+# (path, size, mtime_ns) -> SHA-1 / True, least recently used first
+_hash_cache = OrderedDict()
+_undecodable = OrderedDict()
+_memo_lock = threading.Lock()
+
+# video path -> Future of its generation, only while it is queued or running
+_pending = {}
+_pending_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=GENERATE_WORKERS, thread_name_prefix="thumbnails")
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def _recall(memo, key):
+    with _memo_lock:
+        value = memo.get(key)
+        if value is not None:
+            memo.move_to_end(key)
+        return value
+
+
+def _remember(memo, key, value):
+    with _memo_lock:
+        memo[key] = value
+        memo.move_to_end(key)
+        while len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+
+
+def content_hash(path):
+    """SHA-1 of a file, memoised on (path, size, mtime) so it is only read once per version."""
+    key = _file_key(path)
+    digest = _recall(_hash_cache, key)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _remember(_hash_cache, key, digest)
+    return digest
+
+
+def _image_path(cache_root, digest, kind):
+    return os.path.join(cache_root, digest[:2], f"{digest}_{kind}.jpg")
+
+
+def _resize(frame, width):
+    height = int(frame.shape[0] * width / frame.shape[1])
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _read_frames(path, count):
+    """`count` frames spread evenly over the clip (fewer if the clip is short)."""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    if total > 0:
+        for index in np.linspace(0, total - 1, min(count, total)).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if ok:
+                frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _write_jpeg(path, image, quality):
+    # Write then rename, so a concurrent request never serves half a file
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _generate(video_path, cache_root):
+    """Write a clip's poster and sprite, unless an identical clip already has them."""
+    key = _file_key(video_path)
+    digest = content_hash(video_path)
+    poster_path = _image_path(cache_root, digest, "poster")
+    sprite_path = _image_path(cache_root, digest, "sprite")
+    if os.path.exists(poster_path) and os.path.exists(sprite_path):
+        return
+    frames = _read_frames(video_path, SPRITE_FRAMES)
+    if not frames:
+        _remember(_undecodable, key, True)
+        return
+    os.makedirs(os.path.dirname(poster_path), exist_ok=True)
+    # Poster from a third of the way in, where the flagged action is usually visible
+    poster = frames[len(frames) // 3]
+    _write_jpeg(poster_path, _resize(poster, POSTER_WIDTH), 80)
+    strip = np.hstack([_resize(frame, SPRITE_FRAME_WIDTH) for frame in frames])
+    _write_jpeg(sprite_path, strip, 70)
+
+
+def _generated(video_path, future):
+    with _pending_lock:
+        _pending.pop(video_path, None)
+    error = future.exception()
+    if error is not None:
+        print(f"[ERROR] Thumbnail generation failed for {video_path}: {error}")
+
+
+def generate_in_background(video_path, cache_root):
+    """Queue a clip's images for generation; a clip already queued is not queued twice."""
+    with _pending_lock:
+        if video_path in _pending:
+            return _pending[video_path]
+        future = _pending[video_path] = _pool.submit(_generate, video_path, cache_root)
+    # Outside the lock: the callback runs at once if the job has already finished
+    future.add_done_callback(partial(_generated, video_path))
+    return future
+
+
+def get_thumbnail(video_path, cache_root, kind):
+    """
+    Path to the cached poster ("poster") or keyframe strip ("sprite") for a
+    proof clip. Images are stored under `cache_root/<hash[:2]>/<hash>_<kind>.jpg`,
+    keyed by the clip's content, so a re-encoded or replaced clip gets fresh
+    images.
+
+    The sprite is SPRITE_FRAMES frames side by side, each SPRITE_FRAME_WIDTH
+    wide. Hashing and decoding happen on a background pool: until both
+    images exist this queues them and returns PENDING. Returns None if the
+    clip is missing or no frame can be decoded.
+    """
+    try:
+        key = _file_key(video_path)
+    except OSError:
+        return None
+    digest = _recall(_hash_cache, key)
+    if digest is not None:
+        target = _image_path(cache_root, digest, kind)
+        if os.path.exists(target):
+            return target
+    if _recall(_undecodable, key):
+        return None
+    generate_in_background(video_path, cache_root)
+    return PENDING
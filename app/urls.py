@@ -4,7 +4,6 @@ from django.urls import path
 from . import views
 from django.conf.urls import url
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -19,14 +18,24 @@ urlpatterns = [
     path('profile/change-password/', views.change_password, name='change_password'),
     path('logout/',views.logout, name='logout'),
     path('malpractice_log/',views.malpractice_log, name='malpractice_log'),
+    path('malpractice_log/new/', views.new_detections, name='new_detections'),
+    path('malpractice_log/export/', views.export_malpractice_log, name='export_malpractice_log'),
     path('review_malpractice/', views.review_malpractice, name='review_malpractice'),
     path('delete_malpractice/<int:log_id>/', views.delete_malpractice, name='delete_malpractice'),
+    path('bulk_review_malpractice/', views.bulk_review_malpractice, name='bulk_review_malpractice'),
+    path('bulk_delete_malpractice/', views.bulk_delete_malpractice, name='bulk_delete_malpractice'),
+    path('review_queue/', views.review_queue, name='review_queue'),
+    path('review_queue/next/', views.review_queue_next, name='review_queue_next'),
+    path('analytics/', views.detection_analytics, name='detection_analytics'),
+    path('proof_thumbnail/<int:log_id>/<str:kind>/', views.proof_thumbnail, name='proof_thumbnail'),
     path('manage-lecture-halls/', views.manage_lecture_halls, name='manage_lecture_halls'),
     path('view_teachers/', views.view_teachers, name='view_teachers'),
     path('run_cameras/', views.run_cameras_page, name='run_cameras_page'),
     path('trigger_camera_scripts/', views.trigger_camera_scripts, name='trigger_camera_scripts'),
     path('stop_camera_scripts/', views.stop_camera_scripts, name='stop_camera_scripts'),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('camera_status/', views.camera_status, name='camera_status'),
+    path('camera_preview/<int:index>/', views.camera_preview, name='camera_preview'),
+    path('camera_job_status/<str:job_id>/', views.camera_job_status, name='camera_job_status'),
+    # Media is served by an authenticated view (Range/ETag aware) instead of static()
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', views.protected_media, name='protected_media'),
+]
\ No newline at end of file
@@ -2,8 +2,20 @@
 from django.conf import settings
 from twilio.rest import Client
 import paramiko
-import os
-import subprocess
+import ntpath
+import threading
+import time
+
+_twilio_client = None
+
+
+def twilio_client():
+    """One Twilio client per process; it keeps its HTTP session alive between messages."""
+    global _twilio_client
+    if _twilio_client is None:
+        _twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return _twilio_client
+
 
 def send_sms_notification(to_phone, message_body):
     """
@@ -11,15 +23,9 @@ def send_sms_notification(to_phone, message_body):
     :param to_phone: str -> phone number in E.164 format, e.g. +919876543210
     :param message_body: str -> The text message
     """
-    # print(to_phone)
-    account_sid = settings.TWILIO_ACCOUNT_SID
-    auth_token = settings.TWILIO_AUTH_TOKEN
-    from_phone = settings.TWILIO_PHONE_NUMBER
-
-    client = Client(account_sid, auth_token)
-    client.messages.create(
+    twilio_client().messages.create(
         body=message_body,
-        from_=from_phone,
+        from_=settings.TWILIO_PHONE_NUMBER,
         to=to_phone
     )
 
@@ -27,38 +33,88 @@ def send_sms_notification(to_phone, message_body):
 
 RUNNING_SCRIPTS = {}
 
-def ssh_run_script(ip, username, password, script_path, use_venv=True, venv_path=None):
+
+class SSHPool:
+    """
+    Keeps one authenticated SSH connection per (ip, username) and hands it
+    back while its transport is still alive, so starting and stopping the
+    same host again doesn't repeat the TCP + key exchange + login.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self.host_locks = {}
+        self.lock = threading.Lock()  # guards the two dicts only, never held while connecting
+
+    def _host_lock(self, key):
+        with self.lock:
+            return self.host_locks.setdefault(key, threading.Lock())
+
+    def get(self, ip, username, password, timeout=None):
+        key = (ip, username)
+        # A slow host only holds up other callers for the same host
+        with self._host_lock(key):
+            with self.lock:
+                ssh = self.clients.get(key)
+            if ssh is not None:
+                transport = ssh.get_transport()
+                if transport is not None and transport.is_active():
+                    return ssh
+                ssh.close()
+
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh.connect(ip, username=username, password=password,
+                        timeout=timeout, banner_timeout=timeout, auth_timeout=timeout)
+            with self.lock:
+                self.clients[key] = ssh
+            return ssh
+
+    def close_all(self):
+        with self.lock:
+            clients = list(self.clients.values())
+            self.clients.clear()
+        for ssh in clients:
+            ssh.close()
+
+
+SSH_POOL = SSHPool()
+
+
+def build_remote_command(username, script_path, use_venv=True, venv_path=None):
+    """Build the Windows command that runs a camera script on a client laptop."""
+    # Client laptops run Windows, so split the path with ntpath whatever the server OS is
+    script_dir = ntpath.dirname(script_path)
+    script_name = ntpath.basename(script_path)
+
+    # Determine activation command if a virtual environment is to be used
+    if use_venv:
+        if not venv_path:
+            venv_path = f'C:/Users/{username}/Documents/PROJECTS/AIInvigilator/susenv/Scripts/activate.bat'
+        activation_cmd = f'call "{venv_path}" && '
+    else:
+        activation_cmd = ""
+
+    # Build the command using proper quoting; use cmd /c so the shell exits after execution
+    command = f'cmd /c "cd /d \"{script_dir}\" && {activation_cmd}python \"{script_name}\""'
+    return command, script_name
+
+
+def ssh_run_script(ip, username, password, script_path, use_venv=True, venv_path=None, timeout=None):
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(ip, username=username, password=password)
-
-        # Get the directory and file name of the script
-        script_dir = os.path.dirname(script_path)
-        script_name = os.path.basename(script_path)
-        
-        # Determine activation command if a virtual environment is to be used
-        if use_venv:
-            if not venv_path:
-                venv_path = f'C:/Users/{username}/Documents/PROJECTS/AIInvigilator/susenv/Scripts/activate.bat'
-            activation_cmd = f'call "{venv_path}" && '
-        else:
-            activation_cmd = ""
-        
-        # Build the command using proper quoting; use cmd /c so the shell exits after execution
-        command = f'cmd /c "cd /d \"{script_dir}\" && {activation_cmd}python \"{script_name}\""'
-        
+        ssh = SSH_POOL.get(ip, username, password, timeout)
+        command, script_name = build_remote_command(username, script_path, use_venv, venv_path)
+
         # Open a session with a pseudo-terminal; this allows us to send Ctrl+C later.
-        channel = ssh.get_transport().open_session()
+        channel = ssh.get_transport().open_session(timeout=timeout)
         channel.get_pty()
         channel.exec_command(command)
-        
-        # Optionally, you can start a thread to read output asynchronously.
-        # For now, we just store the SSH client and channel in our global dictionary.
+
+        # The connection itself stays in SSH_POOL; only the channel belongs to this script.
         key = f"{username}_{script_name}"
         RUNNING_SCRIPTS[key] = {
             "mode": "remote",
-            "ssh": ssh,
+            "ip": ip,
             "channel": channel
         }
         print(f"\n[{username}] Remote script {script_name} started.")
@@ -67,34 +123,25 @@ def ssh_run_script(ip, username, password, script_path, use_venv=True, venv_path
         return False, str(e)
 
 
-def local_run_script(script_path):
+def ssh_stop_script(key, timeout=5):
+    """
+    Send Ctrl+C to a remote script and wait until it exits (or `timeout`
+    passes) instead of sleeping a fixed amount. The pooled connection is
+    left open for the next start.
+    """
+    handle = RUNNING_SCRIPTS.pop(key, None)
+    if not handle:
+        return False, "Not running."
+    channel = handle.get("channel")
+    if channel is None or channel.closed:
+        return True, "Already stopped."
     try:
-        # Get the directory and file name from the script_path
-        script_dir = os.path.dirname(script_path)
-        script_name = os.path.basename(script_path)
-
-        # Build the command without virtual environment activation.
-        command = 'cmd /c "cd /d \"{}\" && python \"{}\""'.format(
-            script_dir, script_name
-        )
-
-        # Start the process
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-            text=True
-        )
-
-        key = f"local_{script_name}"
-        RUNNING_SCRIPTS[key] = {
-            "mode": "local",
-            "process": process
-        }
-        print(f"[Local] Script {script_name} started.")
-        return True, "Local script started successfully."
+        channel.send("\x03")
+        deadline = time.monotonic() + timeout
+        while not channel.exit_status_ready() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        exited = channel.exit_status_ready()
+        channel.close()
+        return True, "Remote process terminated." if exited else "Interrupt sent; channel closed after timeout."
     except Exception as e:
-        return False, str(e)  
-
-
+        return False, str(e)
@@ -1,25 +1,40 @@
 # views.py
 from django.shortcuts import render
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.template.loader import render_to_string
 from .models import *
-from threading import Event, Thread
-from django.http import JsonResponse
+from threading import Event
+from django.http import JsonResponse, StreamingHttpResponse, Http404, HttpResponse, HttpResponseNotModified
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
 from .models import TeacherProfile
 import json
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from datetime import timedelta
 from django.core.mail import send_mail
 from django.conf import settings
-from .utils import send_sms_notification
+from .notifications import enqueue_detection_notifications
 from .forms import EditProfileForm, TeacherProfileForm
 from django.contrib import messages
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.admin.views.decorators import staff_member_required
-from .utils import ssh_run_script, local_run_script
+from .camera_jobs import start_cameras, stop_cameras, job_status
+from .supervisor import supervisor
+from .media import serve_media
+from .thumbnails import PENDING, get_thumbnail
+from .file_cleaner import remove_files
+from .exports import EXPORT_FORMATS, export_rows, keyset_after, parquet_available
+from .retention import proof_file, proof_paths
+from . import summary
+from . import cache
+from . import events  # registers the detection signal handlers that feed /events/stream/
 import threading
 import os
 import subprocess
@@ -29,6 +44,11 @@ import time
 # Global stop event
 stop_event = Event()
 
+LOG_PAGE_SIZE = 50  # rows per malpractice_log page
+BULK_MAX_IDS = 500  # ids accepted by one bulk review/delete request
+REVIEW_QUEUE_BATCH = 10  # items handed to the review queue page per request
+
+
 def is_admin(user):
     return user.is_superuser
 
@@ -154,148 +174,190 @@ def change_password(request):
 
 
 
-@login_required
-def malpractice_log(request):
-    # Retrieve filter parameters from the GET request
-    date_filter = request.GET.get('date', '').strip()
-    time_filter = request.GET.get('time', '').strip()
-    malpractice_filter = request.GET.get('malpractice_type', '').strip()
-    building_filter = request.GET.get('building', '').strip()
-    query = request.GET.get('q', '').strip()
-    faculty_filter = request.GET.get('faculty', '').strip()
-    assignment_filter = request.GET.get('assigned', '').strip()
-    review_filter = request.GET.get('review', '').strip() or 'not_reviewed'
-
-
-    # Base Queryset based on user role
+def filtered_logs(request):
+    """
+    Detections visible to the user with the malpractice_log filters from the
+    query string applied, newest first. Returns (queryset, filters).
+    """
+    filters = {
+        'date_filter': request.GET.get('date', '').strip(),
+        'time_filter': request.GET.get('time', '').strip(),
+        'malpractice_filter': request.GET.get('malpractice_type', '').strip(),
+        'building_filter': request.GET.get('building', '').strip(),
+        'query': request.GET.get('q', '').strip(),
+        'faculty_filter': request.GET.get('faculty', '').strip(),
+        'assignment_filter': request.GET.get('assigned', '').strip(),
+        'review_filter': request.GET.get('review', '').strip() or 'not_reviewed',
+    }
+
+    # Base Queryset based on user role; the rows show the hall and its teacher, so join them in
+    logs = visible_logs(request.user).select_related('lecture_hall__assigned_teacher')
     if request.user.is_superuser:
-        logs = MalpraticeDetection.objects.all()
         # Apply review filter for admin
-        if review_filter.lower() == 'reviewed':
+        if filters['review_filter'].lower() == 'reviewed':
             logs = logs.filter(verified=True)
-        elif review_filter.lower() == 'not_reviewed':
+        elif filters['review_filter'].lower() == 'not_reviewed':
             logs = logs.filter(verified=False)
-    else:
-        assigned_halls = LectureHall.objects.filter(assigned_teacher=request.user)
-        logs = MalpraticeDetection.objects.filter(
-            lecture_hall__in=assigned_halls,
-            verified=True,
-            is_malpractice=True
-        )
 
     # Apply Filtering
-    if date_filter:
-        logs = logs.filter(date=date_filter)
-    if time_filter:
-        if time_filter.upper() == "FN":
+    if filters['date_filter']:
+        logs = logs.filter(date=filters['date_filter'])
+    if filters['time_filter']:
+        if filters['time_filter'].upper() == "FN":
             logs = logs.filter(time__lt="12:00:00")
-        elif time_filter.upper() == "AN":
+        elif filters['time_filter'].upper() == "AN":
             logs = logs.filter(time__gte="12:00:00")
-    if malpractice_filter:
-        logs = logs.filter(malpractice=malpractice_filter)
-    if building_filter:
-        logs = logs.filter(lecture_hall__building=building_filter)
-    if query:
-        logs = logs.filter(lecture_hall__hall_name__icontains=query)
-    if faculty_filter:
-        logs = logs.filter(lecture_hall__assigned_teacher__id=faculty_filter)
-    if assignment_filter:
-        if assignment_filter.lower() == "assigned":
+    if filters['malpractice_filter']:
+        logs = logs.filter(malpractice=filters['malpractice_filter'])
+    if filters['building_filter']:
+        logs = logs.filter(lecture_hall__building=filters['building_filter'])
+    if filters['query']:
+        logs = logs.filter(lecture_hall__hall_name__icontains=filters['query'])
+    if filters['faculty_filter']:
+        logs = logs.filter(lecture_hall__assigned_teacher__id=filters['faculty_filter'])
+    if filters['assignment_filter']:
+        if filters['assignment_filter'].lower() == "assigned":
             logs = logs.filter(lecture_hall__assigned_teacher__isnull=False)
-        elif assignment_filter.lower() == "unassigned":
+        elif filters['assignment_filter'].lower() == "unassigned":
             logs = logs.filter(lecture_hall__assigned_teacher__isnull=True)
 
-    # if review_filter:
-    #     if review_filter.lower() == 'reviewed':
-    #         logs = logs.filter(verified=True)
-    #     elif review_filter.lower() == 'not_reviewed':
-    #         logs = logs.filter(verified=False)
-
-    logs = logs.order_by('-date', '-time')
-
-    # Update session record count to trigger alert if new logs appear
-    record_count = logs.count()
-    alert = False
-    if "record_count" in request.session:
-        if request.session["record_count"] < record_count:
-            alert = True
-            request.session["record_count"] = record_count
-    else:
-        request.session["record_count"] = record_count
+    # id breaks ties between detections logged in the same second, so the keyset order is total
+    return logs.order_by('-date', '-time', '-id'), filters
+
+
+def encode_cursor(log):
+    # A missing date or time (both columns are nullable) is left empty
+    day = log.date.isoformat() if log.date else ''
+    at = log.time.isoformat() if log.time else ''
+    return f"{day}_{at}_{log.id}"
+
+
+def after_cursor(logs, cursor):
+    """Rows strictly after `cursor` in (-date, -time, -id) order; an invalid cursor is ignored."""
+    try:
+        date_part, time_part, id_part = cursor.split('_')
+        last_date = parse_date(date_part) if date_part else None
+        last_time = parse_time(time_part) if time_part else None
+        last_id = int(id_part)
+    except ValueError:  # wrong number of parts, a non-numeric id or an out-of-range date/time
+        return logs
+    if (date_part and last_date is None) or (time_part and last_time is None):
+        return logs
+    return logs.filter(keyset_after(last_date, last_time, last_id))
+
+
+def log_page(logs, cursor=''):
+    """One page of `logs` plus the cursor for the next page ('' when this is the last one)."""
+    if cursor:
+        logs = after_cursor(logs, cursor)
+    page = list(logs[:LOG_PAGE_SIZE + 1])
+    next_cursor = encode_cursor(page[LOG_PAGE_SIZE - 1]) if len(page) > LOG_PAGE_SIZE else ''
+    return page[:LOG_PAGE_SIZE], next_cursor
+
+
+@login_required
+def malpractice_log(request):
+    logs, filters = filtered_logs(request)
 
+    # Later pages are fetched by the "Load more" control as rendered rows
+    cursor = request.GET.get('after', '').strip()
+    if cursor:
+        page, next_cursor = log_page(logs, cursor)
+        try:
+            row_offset = int(request.GET.get('offset', 0) or 0)
+        except ValueError:
+            row_offset = 0
+        html = render_to_string('malpractice_log_rows.html', {
+            'result': page,
+            'row_offset': row_offset,
+            'is_admin': request.user.is_superuser,
+        }, request=request)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor, 'count': len(page)})
+
+    page, next_cursor = log_page(logs)
+
+    # Everything but the page itself comes from the cache on a warm load
     context = {
-        'result': logs,
-        'alert': alert,
+        'result': page,
+        'next_cursor': next_cursor,
+        # May lag a camera insert by up to PAGE_CACHE_TTL; the poll skips rows already shown
+        'latest_id': cache.latest_detection_id(),
+        'row_offset': 0,
         'is_admin': request.user.is_superuser,
-        'date_filter': date_filter,
-        'time_filter': time_filter,
-        'malpractice_filter': malpractice_filter,
-        'building_filter': building_filter,
-        'query': query,
-        'faculty_filter': faculty_filter,
-        'assignment_filter': assignment_filter,
-        'review_filter': review_filter,  # Pass review filter to template
-        'faculty_list': User.objects.filter(teacherprofile__isnull=False, is_superuser=False),
-        'buildings': LectureHall.objects.values_list('building', flat=True).distinct(),
+        **filters,
+        'log_counts': cache.log_counts(request.user, visible_logs(request.user)),
+        'faculty_list': cache.faculty_list(),
+        'buildings': cache.buildings(),
     }
 
     return render(request, 'malpractice_log.html', context)
 
 
 
-@csrf_exempt
 @login_required
-@user_passes_test(is_admin)
-def send_notifications_background(log_id):
-    """Send email and SMS notifications in background thread"""
-    try:
-        log = MalpraticeDetection.objects.get(id=log_id)
-        teacher_user = log.lecture_hall.assigned_teacher
-        
-        try:
-            teacher_profile = teacher_user.teacherprofile
-        except TeacherProfile.DoesNotExist:
-            print(f"[WARN] No profile found for user: {teacher_user.username}")
-            teacher_profile = None
-
-        # Send Email Notification
-        subject = 'Malpractice Alert: New Case Reviewed'
-        message_body = (
-            f"Dear {teacher_user.get_full_name() or teacher_user.username},\n\n"
-            f"A malpractice has been detected in your classroom and has been approved by the examination cell.\n\n"
-            f"Details:\n"
-            f"- 📅 Date: {log.date}\n"
-            f"- ⏰ Time: {log.time}\n"
-            f"- 🎯 Type: {log.malpractice}\n"
-            f"- 🏫 Lecture Hall: {log.lecture_hall.building} - {log.lecture_hall.hall_name}\n\n"
-            f"You can view the recorded video proof from your AIInvigilator portal.\n\n"
-            f"Best regards,\nAIInvigilator Team"
-        )
+def export_malpractice_log(request):
+    """
+    The malpractice_log rows under the current filters as a streamed CSV
+    (default) or Parquet (`?format=parquet`) download.
+    """
+    export_format = request.GET.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'Unknown export format'}, status=400)
+    if export_format == 'parquet' and not parquet_available():
+        return JsonResponse({'success': False, 'error': 'Parquet export is not available on this server'}, status=501)
+
+    logs, filters = filtered_logs(request)
+    chunks, content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(chunks(export_rows(logs)), content_type=content_type)
+    filename = f"malpractice_log_{timezone.localtime():%Y%m%d_%H%M}.{extension}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-cache, private'
+    return response
 
-        try:
-            send_mail(subject, message_body, settings.EMAIL_HOST_USER, [teacher_user.email], fail_silently=False)
-        except Exception as e:
-            print(f"\n[ERROR] Email sending failed: {e}\n")
-
-        # Send SMS Notification if phone is available
-        if teacher_profile and teacher_profile.phone:
-            sms_message_body = (
-                f'''
-                \nDear {teacher_user.get_full_name() or teacher_user.username},\n\n'''
-                f"🔔 Malpractice Alert\n"
-                f"{log.date} | {log.time}\n"
-                f"{log.malpractice} detected in {log.lecture_hall.building}-{log.lecture_hall.hall_name}.\n"
-                f"\nCheck AIInvigilator for video proof."
-            )
 
-            try:
-                send_sms_notification(f"+91{teacher_profile.phone.strip()}", sms_message_body)
-            except Exception as e:
-                print(f"\n[ERROR] SMS sending failed: {e}\n")
-    except Exception as e:
-        print(f"[ERROR] Background notification failed: {e}")
+@login_required
+def new_detections(request):
+    """
+    Rows added since the client's `since_id`, with the malpractice_log filters,
+    rendered for prepending. The ETag is the newest detection id overall, so
+    a poll when nothing was inserted costs one MAX(id) and returns 304.
+    """
+    try:
+        since_id = int(request.GET.get('since_id', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since_id'}, status=400)
+
+    latest_id = MalpraticeDetection.objects.aggregate(latest=Max('id'))['latest'] or 0
+    cache.saw_detection(latest_id)
+    etag = f'"{latest_id}"'
+    if latest_id <= since_id or request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    logs, filters = filtered_logs(request)
+    rows = list(logs.filter(id__gt=since_id, id__lte=latest_id)[:LOG_PAGE_SIZE + 1])
+    html = render_to_string('malpractice_log_rows.html', {
+        'result': rows[:LOG_PAGE_SIZE],
+        'row_offset': 0,
+        'is_admin': request.user.is_superuser,
+    }, request=request)
+    response = JsonResponse({
+        'html': html,
+        'count': min(len(rows), LOG_PAGE_SIZE),
+        # Too many to prepend: the client reloads the table instead
+        'truncated': len(rows) > LOG_PAGE_SIZE,
+        'latest_id': latest_id,
+    })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache, private'
+    return response
+
 
 
+@csrf_exempt
+@login_required
+@user_passes_test(is_admin)
 def review_malpractice(request):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
@@ -308,22 +370,26 @@ def review_malpractice(request):
         if not proof_filename or decision not in ['yes', 'no']:
             return JsonResponse({'success': False, 'error': 'Invalid data received'})
 
-        # Find the malpractice log
-        try:
-            log = MalpraticeDetection.objects.get(proof=proof_filename)
-        except MalpraticeDetection.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Malpractice log not found'})
+        with transaction.atomic():
+            # Lock the analytics summary first so the review is counted exactly once
+            watermark = summary.locked_watermark()
 
-        # Update the log
-        log.verified = True
-        log.is_malpractice = (decision == 'yes')
-        log.save()
+            # Find the malpractice log
+            try:
+                log = MalpraticeDetection.objects.get(proof=proof_filename)
+            except MalpraticeDetection.DoesNotExist:
+                return JsonResponse({'success': False, 'error': 'Malpractice log not found'})
+
+            # Update the log
+            old_status = summary.review_status(log.verified, log.is_malpractice)
+            log.verified = True
+            log.is_malpractice = (decision == 'yes')
+            log.save()
+            summary.record_reviews([(log, old_status)], watermark)
 
-        # If approved as malpractice, send notifications in background thread
-        if log.is_malpractice and log.lecture_hall and log.lecture_hall.assigned_teacher:
-            notification_thread = Thread(target=send_notifications_background, args=(log.id,))
-            notification_thread.daemon = True
-            notification_thread.start()
+        # If approved as malpractice, queue the teacher's notifications for the worker
+        if log.is_malpractice:
+            enqueue_detection_notifications(log)
 
         return JsonResponse({'success': True})
 
@@ -353,17 +419,10 @@ def delete_malpractice(request, log_id):
             if not log.lecture_hall or log.lecture_hall.assigned_teacher != user:
                 return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
         
-        # Delete the video file from media folder
-        if log.proof:
-            video_path = os.path.join(settings.MEDIA_ROOT, log.proof)
-            if os.path.exists(video_path):
-                try:
-                    os.remove(video_path)
-                except Exception as e:
-                    print(f"[WARN] Could not delete video file: {e}")
-        
-        # Delete the log from database
+        # Delete the log from database; the video file is removed in the background
         log.delete()
+        if log.proof:
+            remove_files(proof_paths(log.proof))
         
         return JsonResponse({'success': True})
         
@@ -375,17 +434,215 @@ def delete_malpractice(request, log_id):
 
 
 
+def bulk_ids(request):
+    """The `ids` list from a JSON bulk request body as a set of ints, or None if it is missing or malformed."""
+    if request.content_type != 'application/json':
+        return None
+    try:
+        ids = json.loads(request.body).get('ids')
+        if not isinstance(ids, list) or not 0 < len(ids) <= BULK_MAX_IDS:
+            return None
+        return {int(log_id) for log_id in ids}
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_review_malpractice(request):
+    """
+    Review several logs at once with a single UPDATE ... WHERE id IN.
+    Body: {"ids": [...], "decision": "yes" | "no"}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+
+    ids = bulk_ids(request)
+    try:
+        decision = json.loads(request.body).get('decision')
+    except (ValueError, AttributeError):
+        decision = None
+    if ids is None or decision not in ['yes', 'no']:
+        return JsonResponse({'success': False, 'error': 'Invalid data received'}, status=400)
+
+    try:
+        is_malpractice = (decision == 'yes')
+        with transaction.atomic():
+            watermark = summary.locked_watermark()
+            logs = list(MalpraticeDetection.objects.filter(id__in=ids)
+                        .select_related('lecture_hall__assigned_teacher__teacherprofile'))
+            old_statuses = [summary.review_status(log.verified, log.is_malpractice) for log in logs]
+            # Only cases that weren't already approved notify the teacher again
+            newly_approved = [log for log, status in zip(logs, old_statuses)
+                              if is_malpractice and status != 'approved']
+
+            MalpraticeDetection.objects.filter(id__in=[log.id for log in logs]).update(
+                verified=True, is_malpractice=is_malpractice)
+            for log in logs:
+                log.verified = True
+                log.is_malpractice = is_malpractice
+            summary.record_reviews(zip(logs, old_statuses), watermark)
+            for log in newly_approved:
+                enqueue_detection_notifications(log)
+
+        # update() sends no post_save, so invalidate and publish the review events here
+        cache.bump(cache.DETECTIONS)
+        for log in logs:
+            if events.broker.subscribers:
+                events.broker.publish(events.detection_event(log, "reviewed"))
+
+        updated = sorted(log.id for log in logs)
+        return JsonResponse({'success': True, 'updated': updated, 'missing': sorted(ids - set(updated))})
+
+    except Exception as e:
+        print(f"[EXCEPTION] Unexpected error in bulk_review_malpractice: {e}")
+        return JsonResponse({'success': False, 'error': 'Internal server error'}, status=500)
+
+
+@login_required
+def bulk_delete_malpractice(request):
+    """
+    Delete several logs at once. Admins can delete any log, teachers only
+    those from their assigned halls; ids the user may not delete (or that no
+    longer exist) are left alone and reported back as `skipped`.
+    Body: {"ids": [...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+
+    ids = bulk_ids(request)
+    if ids is None:
+        return JsonResponse({'success': False, 'error': 'Invalid data received'}, status=400)
+
+    try:
+        # Permission check and the proofs to remove come from one query
+        logs = MalpraticeDetection.objects.filter(id__in=ids)
+        if not request.user.is_superuser:
+            logs = logs.filter(lecture_hall__assigned_teacher=request.user)
+        allowed = list(logs.values_list('id', 'proof'))
+        deleted = sorted(log_id for log_id, proof in allowed)
+
+        if deleted:
+            # One grouped summary update for the whole batch, not one per row
+            with summary.grouped_deletes():
+                MalpraticeDetection.objects.filter(id__in=deleted).delete()
+            remove_files([path for log_id, proof in allowed if proof for path in proof_paths(proof)])
+
+        return JsonResponse({'success': True, 'deleted': deleted, 'skipped': sorted(ids - set(deleted))})
+
+    except Exception as e:
+        print(f"[EXCEPTION] Error bulk deleting malpractice logs: {e}")
+        return JsonResponse({'success': False, 'error': 'Internal server error'}, status=500)
+
+
+@login_required
+@user_passes_test(is_admin)
+def review_queue(request):
+    """One-clip-at-a-time review page; items come from review_queue_next."""
+    return render(request, 'review_queue.html', {
+        'remaining': cache.log_counts(request.user, visible_logs(request.user))['pending'],
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def review_queue_next(request):
+    """
+    The next unreviewed detections after id `after`, oldest first, with
+    what the review page needs to show and prefetch each clip.
+    """
+    try:
+        after_id = int(request.GET.get('after', 0))
+    except ValueError:
+        after_id = 0
+
+    pending = MalpraticeDetection.objects.filter(verified=False)
+    logs = (pending.filter(id__gt=after_id)
+            .select_related('lecture_hall__assigned_teacher')
+            .order_by('id')[:REVIEW_QUEUE_BATCH])
+    items = []
+    for log in logs:
+        hall = log.lecture_hall
+        teacher = hall.assigned_teacher if hall else None
+        items.append({
+            'id': log.id,
+            'video': settings.MEDIA_URL + log.proof,
+            'poster': reverse('proof_thumbnail', args=[log.id, 'poster']),
+            'date': str(log.date),
+            'time': str(log.time),
+            'malpractice': log.malpractice,
+            'hall': f"{hall.building} - {hall.hall_name}" if hall else "N/A",
+            'teacher': (teacher.get_full_name() or teacher.username) if teacher else "Unassigned",
+        })
+    return JsonResponse({'items': items, 'remaining': pending.count()})
+
+
+ANALYTICS_DAYS = 30  # default dashboard range
+
+
+def date_param(request, name, default):
+    try:
+        return parse_date(request.GET.get(name, '')) or default
+    except ValueError:
+        return default
+
+
+def summary_counts(rows, *fields):
+    counts = {name: Sum(name) for name in ('total', 'pending', 'approved', 'rejected')}
+    if not fields:
+        return rows.aggregate(**counts)
+    return list(rows.values(*fields).annotate(**counts).order_by(*fields))
+
+
+@login_required
+@user_passes_test(is_admin)
+def detection_analytics(request):
+    """
+    Counts per day, building, hall and malpractice type. Reads only
+    DailyDetectionSummary, after folding in detections added since the last visit.
+    """
+    summary.sync_summary()
+
+    today = timezone.localdate()
+    start = date_param(request, 'start', today - timedelta(days=ANALYTICS_DAYS - 1))
+    end = date_param(request, 'end', today)
+    building_filter = request.GET.get('building', '')
+
+    rows = DailyDetectionSummary.objects.filter(date__gte=start, date__lte=end)
+    if building_filter:
+        rows = rows.filter(lecture_hall__building=building_filter)
+
+    by_type = sorted(summary_counts(rows, 'malpractice'), key=lambda row: -row['total'])
+    by_hall = sorted(summary_counts(rows, 'lecture_hall__building', 'lecture_hall__hall_name'),
+                     key=lambda row: -row['total'])
+    by_day = summary_counts(rows, 'date')
+    peak = max([row['total'] for row in by_day] or [0])
+
+    return render(request, 'detection_analytics.html', {
+        'totals': summary_counts(rows),
+        'by_day': by_day,
+        'by_building': summary_counts(rows, 'lecture_hall__building'),
+        'by_hall': by_hall,
+        'by_type': by_type,
+        'peak': peak,
+        'start': start,
+        'end': end,
+        'building_filter': building_filter,
+        'buildings': LectureHall.BUILDING_CHOICES,
+    })
+
+
 @login_required
 @user_passes_test(is_admin)
 def manage_lecture_halls(request):
-    teachers = User.objects.filter(is_superuser=False)
+    teachers = cache.teachers()
     error_message = None
     query = request.GET.get('q', '')
     building_filter = request.GET.get('building', '')
     assignment_filter = request.GET.get('assigned', '')
 
-    buildings = LectureHall.objects.values_list('building', flat=True).distinct()
-    lecture_halls = LectureHall.objects.all()
+    buildings = cache.buildings()
+    lecture_halls = LectureHall.objects.select_related('assigned_teacher')
 
     if query:
         lecture_halls = lecture_halls.filter(hall_name__icontains=query)
@@ -439,8 +696,8 @@ def view_teachers(request):
     building_filter = request.GET.get('building', '')
 
     # Use the reverse relation "lecturehall" (LectureHall.assigned_teacher) 
-    teachers = User.objects.filter(is_superuser=False).select_related('lecturehall')
-    buildings = LectureHall.objects.values_list('building', flat=True).distinct()
+    teachers = User.objects.filter(is_superuser=False).select_related('lecturehall', 'teacherprofile')
+    buildings = LectureHall.objects.order_by('building').values_list('building', flat=True).distinct()
 
     if assigned_filter == 'assigned':
         teachers = teachers.filter(lecturehall__isnull=False)
@@ -461,10 +718,74 @@ def view_teachers(request):
 
 
 
+def visible_logs(user):
+    """Detections a user may open: everything for admins, approved ones in their own halls for teachers."""
+    if user.is_superuser:
+        return MalpraticeDetection.objects.all()
+    return MalpraticeDetection.objects.filter(
+        lecture_hall__assigned_teacher=user,
+        verified=True,
+        is_malpractice=True
+    )
+
+
+@login_required
+def protected_media(request, path):
+    """
+    Proof clips and profile pictures. Admins can open any file; teachers only
+    the approved proofs of their own lecture halls (what malpractice_log shows them).
+    """
+    full_path, archived = proof_file(path)
+    path = path.replace('\\', '/')
+    # Admins also get files no detection points at, e.g. clips found by the orphan scan
+    if (not request.user.is_superuser and not path.startswith('profile_pics/')
+            and not visible_logs(request.user).filter(proof=path).exists()):
+        raise Http404("File not found")
+    if archived:
+        # The accel location only maps MEDIA_ROOT; archived clips are sent from here
+        return serve_media(request, full_path)
+    return serve_media(request, full_path, settings.MEDIA_ACCEL_MODE, settings.MEDIA_ACCEL_PREFIX, path)
+
+
+@login_required
+def proof_thumbnail(request, log_id, kind):
+    """Poster image or keyframe strip for a proof clip; a 503 while it is still being generated."""
+    if kind not in ('poster', 'sprite'):
+        raise Http404("Unknown thumbnail")
+    log = visible_logs(request.user).filter(id=log_id).first()
+    if log is None:
+        raise Http404("File not found")
+    video_path, archived = proof_file(log.proof)
+    thumb_path = get_thumbnail(video_path, settings.THUMBNAIL_ROOT, kind)
+    if thumb_path == PENDING:
+        response = HttpResponse('Thumbnail is being generated', status=503, content_type='text/plain')
+        response['Retry-After'] = '2'
+        return response
+    if thumb_path is None:
+        raise Http404("No frames in clip")
+    return serve_media(request, thumb_path)
+
+
 @login_required
 @user_passes_test(is_admin)
 def run_cameras_page(request):
-    return render(request, 'run_cameras.html')
+    previews = [
+        {'index': i, 'name': config['name']}
+        for i, config in enumerate(settings.CAMERA_CONFIGS) if config.get('preview_port')
+    ]
+    return render(request, 'run_cameras.html', {'previews': previews})
+
+
+@login_required
+@user_passes_test(is_admin)
+def camera_preview(request, index):
+    """
+    Live camera previews are relayed by app/asgi.py, which answers this URL
+    before Django sees it: a never-ending stream would pin a Django thread
+    per viewer. Reached only under the WSGI dev server.
+    """
+    return JsonResponse({'error': 'Live preview needs the ASGI server (uvicorn app.asgi:application)'},
+                        status=503)
 
 
 
@@ -472,101 +793,39 @@ def run_cameras_page(request):
 @user_passes_test(lambda u: u.is_superuser) 
 def trigger_camera_scripts(request):
     if request.method == 'POST':
-        # List of configurations for each angle
-        client_configs = [
-            {
-                "name": "Top Corner - Host(Allen 2)",
-                "script_path": "C:\\Users\\noelm\\Documents\\PROJECTS\\AIInvigilator\\ML\\front.py",
-                "mode": "local"
-            },
-            # {
-            #     "name": "Top Corner Angle - Remote Client(Allen)",
-            #     "ip": "192.168.154.9",
-            #     "username": "allen",
-            #     "password": "5213",
-            #     "script_path": "D:\\application\\ML\\top_corner.py",
-            #     "mode": "remote",
-            #     "use_venv": False  # disable venv activation for this host
-            # },
-            # {
-            #     "name": "Front Angle - Remote Client(Shruti)",
-            #     "ip": "192.168.39.145",
-            #     "username": "SHRUTI S",
-            #     "password": "1234shibu",
-            #     "script_path": "C:\\Users\\SHRUTI S\\Documents\\Repos\\AIInvigilator\\application\\application\\ML\\front.py",
-            #     "mode": "remote",
-            #     "use_venv": False 
-            # },
-            # {
-            #     "name": "Front Angle - Remote Client(Noel)",
-            #     "ip": "192.168.1.8",
-            #     "username": "noelmathen",
-            #     "password": "134652",
-            #     "mode": "remote",
-            #     "script_path": "C:\\Users\\noelmathen\\Documents\\PROJECTS\\AIInvigilator\\ML\\front.py",
-            #     "use_venv": True
-            # }
-        ]
-
-        # Function to run a given configuration
-        def run_on_client(config):
-            if config.get("mode") == "remote":
-                use_venv = config.get("use_venv", True)
-                venv_path = config.get("venv_path", None)
-                success, output = ssh_run_script(
-                    config["ip"],
-                    config["username"],
-                    config["password"],
-                    config["script_path"],
-                    use_venv,
-                    venv_path
-                )
-                print(f"[{config['name']}]: {output if success else 'Error: ' + output}")
-            elif config.get("mode") == "local":
-                success, output = local_run_script(config["script_path"])
-                print(f"[{config['name']}]: {output if success else 'Error: ' + output}")
-
-        # Launch each script in a separate thread
-        for config in client_configs:
-            threading.Thread(target=run_on_client, args=(config,)).start()
-
-        return JsonResponse({'status': 'started'})
-    
+        # Local cameras go to the supervisor; remote hosts are started in parallel
+        # in the background. The page polls camera_job_status with the job id.
+        job_id = start_cameras(settings.CAMERA_CONFIGS)
+        return JsonResponse({'status': 'started', 'job_id': job_id})
+
+
+
+@login_required
+@user_passes_test(is_admin)
+def camera_status(request):
+    """Per-worker state, FPS and memory for the Run Cameras page."""
+    workers = supervisor.status()
+    for key, handle in RUNNING_SCRIPTS.items():
+        workers.append({'name': key, 'mode': handle.get('mode'), 'state': 'running'})
+    return JsonResponse({'workers': workers})
+
+
+@login_required
+@user_passes_test(is_admin)
+def camera_job_status(request, job_id):
+    """Per-host progress of a start/stop job."""
+    status = job_status(job_id)
+    if status is None:
+        return JsonResponse({'error': 'Unknown job'}, status=404)
+    return JsonResponse(status)
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def stop_camera_scripts(request):
     if request.method == 'POST':
-        # Iterate over a copy of the keys so we can safely remove items
-        for key in list(RUNNING_SCRIPTS.keys()):
-            handle = RUNNING_SCRIPTS[key]
-            if handle.get("mode") == "remote":
-                try:
-                    channel = handle.get("channel")
-                    if channel:
-                        # Send Ctrl+C to the remote process
-                        channel.send("\x03")
-                        # Wait a moment for the remote process to handle the interrupt
-                        time.sleep(2)
-                        channel.close()
-                    ssh = handle.get("ssh")
-                    if ssh:
-                        ssh.close()
-                    print(f"\n[{key}] Remote process terminated successfully.")
-                except Exception as e:
-                    print(f"\n[{key}] Error terminating remote process: {e}")
-            elif handle.get("mode") == "local":
-                process = handle.get("process")
-                if process:
-                    try:
-                        process.terminate()
-                        process.wait(timeout=5)
-                        print(f"\n[{key}] Local process terminated successfully.")
-                    except Exception as e:
-                        print(f"\n[{key}] Error terminating local process: {e}")
-            RUNNING_SCRIPTS.pop(key, None)
-        return JsonResponse({"status": "stopped"})
+        job_id = stop_cameras()
+        return JsonResponse({"status": "stopping", "job_id": job_id})
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
@@ -0,0 +1,17 @@
+#!/bin/sh
+# start.sh - container entrypoint: the web server plus the notification worker
+set -e
+
+python manage.py collectstatic --noinput
+
+# Approving a detection only queues its email/SMS in NotificationOutbox; this
+# process sends them. It is restarted if it ever exits, so alerts don't stop
+(while true; do
+    python manage.py run_notification_worker || echo "[WARN] Notification worker exited ($?), restarting"
+    sleep 5
+done) &
+
+# ASGI, so the /events/stream/ push channel is served; Django itself runs on
+# a thread pool inside app.asgi (DJANGO_THREADS). One process: the event
+# broker, page cache and camera supervisor all live in it
+exec uvicorn app.asgi:application --host 0.0.0.0 --port 8000